@@ -1,853 +1,1098 @@
 import math
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 import numpy as np
 import streamlit as st
 import io
+import threading
+from collections import namedtuple
+from types import MappingProxyType
+from dataclasses import dataclass, replace
+from enum import IntEnum
+from datetime import date
+from functools import partial
+
+# matplotlib, seaborn and ReportLab are imported on first use (see _get_plotting and
+# _get_pdf_styles), so reruns that draw no charts and build no PDF don't pay for them
+
+InvestmentDetail = namedtuple('InvestmentDetail', 'default_return liquidity tax_efficiency compounding notes')
+
+INVESTMENT_OPTIONS = {
+    'FD': {
+        'default_return': 7.0,
+        'liquidity': 'Medium',
+        'tax_efficiency': 'Taxed at slab rate',
+        'compounding': 'quarterly',
+        'notes': 'Safe, insured up to ₹5L'
+    },
+    'Liquid Funds': {
+        'default_return': 6.75,
+        'liquidity': 'High (T+1)',
+        'tax_efficiency': 'Lower tax if held > 3 years',
+        'compounding': 'daily',
+        'notes': 'Great for idle cash, corporate treasuries'
+    },
+    'SGBs': {
+        'default_return': 2.5,
+        'liquidity': '8-year lock-in',
+        'tax_efficiency': 'Tax-free maturity gains',
+        'compounding': 'annual',
+        'notes': 'Hedge + tax-free if held full term'
+    },
+    'Arbitrage Fund': {
+        'default_return': 7.0,
+        'liquidity': 'High (T+1)',
+        'tax_efficiency': 'Equity taxation (10% after 1 yr)',
+        'compounding': 'daily',
+        'notes': 'Good for high net-worth safety seekers'
+    },
+    'Debt Funds': {
+        'default_return': 7.5,
+        'liquidity': 'Medium',
+        'tax_efficiency': 'Debt tax rules (indexation gone)',
+        'compounding': 'daily',
+        'notes': 'Slightly better than FD on return'
+    }
+}
+# Constant lookup table shared by every session, so freeze it and each entry
+INVESTMENT_OPTIONS = MappingProxyType({name: InvestmentDetail(**attrs) for name, attrs in INVESTMENT_OPTIONS.items()})
+
+COMPOUNDING_PERIODS_PER_YEAR = {
+    'daily': 365,
+    'monthly': 12,
+    'quarterly': 4,
+    'annual': 1
+}
+
+SCENARIO_DESCRIPTIONS = {
+    'scenario1': 'Use your money first to minimize loan.',
+    'scenario2': 'Take a loan for the entire project cost and invest all your available own capital.',
+    'scenario3': 'Contribute a custom amount of own capital directly, and take a loan for the rest. Invest any remaining own capital.'
+}
+
+SCENARIO_KEYS = ('scenario1', 'scenario2', 'scenario3')
+
+
+class Scenario(IntEnum):
+    """Index of a scenario in SCENARIO_KEYS / SCENARIO_NAMES."""
+    MAX_OWN_FUNDING = 0
+    MAX_LEVERAGE = 1
+    BALANCED = 2
+
+
+# Short scenario labels and line markers for the charts and the Excel summary
+SCENARIO_LABELS = ('Scenario 1', 'Scenario 2', 'Scenario 3')
+SCENARIO_MARKERS = ('o', 'x', 's')
+
+SCENARIO_NAMES = [
+    'Scenario 1: Maximum Own Funding',
+    'Scenario 2: Maximum Leverage',
+    'Scenario 3: Balanced Approach'
+]
+
+# Rows of the scenario comparison table and their display formats
+COMPARISON_METRICS = [
+    ('Own Capital Used for Project', '₹{:.1f} lakh'),
+    ('Own Capital Available & Invested', '₹{:.1f} lakh'),
+    ('Loan Amount Required', '₹{:.1f} lakh'),
+    ('Monthly EMI', '₹{:,.0f}'),
+    ('Gross Total Interest Paid (Loan)', '₹{:.1f} lakh'),
+    ('Effective Total Interest (After Tax Benefits)', '₹{:.1f} lakh'),
+    ('Total Investment Maturity Value', '₹{:.2f} lakh'),
+    ('Total Post-Tax Investment Gain', '₹{:.2f} lakh'),
+    ('NET EFFECTIVE COST', '₹{:.2f} lakh')
+]
+
+# Input summary rows: parameter label and a format string applied to the Inputs
+INPUT_SUMMARY_FORMATS = (
+    ('Total Project Cost', "₹{0.project_cost:.1f} lakh"),
+    ('Own Capital Available', "₹{0.own_capital:.1f} lakh"),
+    ('Bank Loan Interest Rate', "{0.loan_rate:.2f}% p.a. ({0.loan_type})"),
+    ('Loan Tenure', "{0.loan_tenure} years"),
+    ('Loan Interest Tax Deductible', "{deductible}"),
+    ('Prepayment Penalty', "{0.prepayment_penalty_pct:.2f}%"),
+    ('Minimum Liquidity Target', "₹{0.min_liquidity_target:.1f} lakh"),
+    ('Investment Type', "{0.investment_type}"),
+    ('Investment Return', "{0.investment_return:.2f}% p.a."),
+    ('Tax Rate', "{0.tax_rate:.0f}%")
+)
+
+# Loan inputs (the right-hand input column): Inputs field, Streamlit widget name and its arguments.
+# None of these depend on another input, so main() renders them from this table in one pass.
+LOAN_INPUT_WIDGETS = (
+    ('loan_rate', 'number_input', {'label': "Bank Loan Interest Rate (% p.a.)", 'min_value': 0.1, 'value': 9.0, 'step': 0.1}),
+    ('loan_type', 'radio', {'label': "Loan Type", 'options': ('Floating', 'Fixed')}),
+    ('loan_tenure', 'number_input', {'label': "Loan Tenure (Years)", 'min_value': 1, 'value': 10, 'step': 1}),
+    ('loan_interest_deductible', 'checkbox', {'label': "Loan Interest Tax-Deductible (for business expenses)", 'value': True}),
+    ('prepayment_penalty_pct', 'number_input', {'label': "Prepayment Penalty (% of outstanding loan)", 'min_value': 0.0, 'value': 0.0, 'step': 0.1}),
+    ('min_liquidity_target', 'number_input', {'label': "Minimum Liquidity Target (in Lakhs ₹)", 'min_value': 0.0, 'value': 10.0, 'step': 1.0})
+)
+
+# Custom capital row, indexed by whether it was entered as a value (True) or a percentage (False)
+CUSTOM_CAPITAL_FORMATS = (
+    "{0.custom_capital_percentage:.1f}% of Own Capital (₹{0.custom_capital_contribution:.1f} lakh)",
+    "₹{0.custom_capital_contribution:.1f} lakh"
+)
+
+# Capital amounts (in lakhs) closer than this are treated as equal; they come from sliders
+CAPITAL_TOLERANCE = 1e-6
+
+# Rupees per lakh. Amounts are kept in lakhs; only the EMI is reported in rupees
+LAKH = 100_000
+
+# Key insight metrics, rendered as one HTML row instead of three st.metric widgets
+_METRIC_CARD = (
+    "<div style='flex:1'>"
+    "<div style='font-size:0.875rem;opacity:0.7'>{label}</div>"
+    "<div style='font-size:1.75rem'>{value}</div>"
+    "</div>"
+)
+KEY_METRICS_TEMPLATE = (
+    "<div style='display:flex;gap:2rem'>"
+    + _METRIC_CARD.format(label="Effective Loan Interest Rate (After Tax) (Annualized)", value="{loan_rate:.2f}% p.a.")
+    + _METRIC_CARD.format(label="Effective Investment Return (After Tax) (Annualized)", value="{investment_return:.2f}% p.a.")
+    + _METRIC_CARD.format(label="Interest Rate Spread (Loan - Investment)", value="{spread:.2f}%")
+    + "</div>"
+)
+
+
+@dataclass(slots=True, frozen=True)
+class Inputs:
+    """User inputs for a financing comparison. Monetary amounts are in lakhs."""
+    project_cost: float
+    own_capital: float
+    loan_rate: float
+    loan_tenure: int
+    tax_rate: float
+    investment_return: float
+    custom_capital_contribution: float
+    loan_interest_deductible: bool
+    investment_type: str
+    prepayment_penalty_pct: float
+    # Display-only fields (used in the report, not in the calculations)
+    loan_type: str = 'Floating'
+    min_liquidity_target: float = 0.0
+    custom_capital_input_type: str = 'Value (Lakhs)'
+    custom_capital_percentage: float = 0.0
+
+
+@dataclass(slots=True, frozen=True)
+class ScenarioResult:
+    """Figures for one financing scenario. Amounts are in lakhs except the EMI, which is in rupees."""
+    description: str
+    capital_used_directly: float
+    capital_invested: float
+    loan_amount: float
+    emi: float
+    total_gross_loan_payments: float # Kept for internal calculation if needed, but not displayed as a primary metric
+    gross_total_interest: float
+    effective_total_interest: float
+    investment_maturity: float
+    investment_gain: float
+    post_tax_gain: float
+    net_effective_cost: float
+
+
+@dataclass(slots=True, frozen=True)
+class ComparisonResults:
+    """Output of calculate_comparison: the three scenarios plus the overall metrics."""
+    scenario1: ScenarioResult
+    scenario2: ScenarioResult
+    scenario3: ScenarioResult
+    recommendation: Scenario
+    savings: float
+    interest_spread: float
+    effective_loan_rate_annual: float
+    effective_investment_return_annual: float
+    prepayment_cost: float
+
+    @property
+    def scenarios(self):
+        """The three scenarios in SCENARIO_KEYS order."""
+        return (self.scenario1, self.scenario2, self.scenario3)
+
+
+ChartImages = namedtuple('ChartImages', 'cost interest bar sweep')
+PdfStyles = namedtuple('PdfStyles', 'paragraphs input_table comparison_table year_wise_table')
+
+
+@st.cache_resource(show_spinner=False)
+def _get_plotting():
+    """matplotlib.pyplot and seaborn, imported once on the first chart render."""
+    import matplotlib
+    matplotlib.use('Agg') # Figures are only ever rendered to PNG images
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    return plt, sns
+
+
+# plt.style.context swaps the process-global rcParams and sessions run on separate threads, so chart
+# builds hold this lock while the style is applied. It comes from st.cache_resource because the script
+# module, and any lock created at module level, is rebuilt on every rerun.
+@st.cache_resource(show_spinner=False)
+def _get_chart_style_lock():
+    """The process-wide lock serializing chart builds."""
+    return threading.Lock()
+
+
+@st.cache_resource(show_spinner=False)
+def _get_pdf_styles():
+    """ReportLab paragraph and table styles, built once on the first PDF export."""
+    from reportlab.platypus import TableStyle
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib import colors
+    from reportlab.lib.enums import TA_CENTER, TA_LEFT
+
+    paragraphs = getSampleStyleSheet()
+    # Custom style for small font tables
+    paragraphs.add(ParagraphStyle(name='TableCaption', fontSize=8, alignment=TA_CENTER))
+    paragraphs.add(ParagraphStyle(name='SmallTableText', fontSize=6, alignment=TA_CENTER))
+    paragraphs.add(ParagraphStyle(name='SmallTableTextLeft', fontSize=6, alignment=TA_LEFT))
+    # Smaller italic style for footnotes
+    paragraphs['Italic'].fontName = 'Helvetica-Oblique'
+    paragraphs['Italic'].fontSize = 9
+    paragraphs['Italic'].alignment = TA_LEFT
+
+    input_table = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#D3D3D3')),
+        ('GRID', (0,0), (-1,-1), 1, colors.black),
+        ('ALIGN', (0,0), (-1,-1), 'LEFT'),
+        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
+        ('BOTTOMPADDING', (0,0), (-1,0), 6),
+        ('BACKGROUND', (0,1), (-1,-1), colors.white),
+        ('FONTSIZE', (0,0), (-1,-1), 10)
+    ])
+
+    comparison_table = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#D3D3D3')),
+        ('GRID', (0,0), (-1,-1), 1, colors.black),
+        ('ALIGN', (0,0), (-1,-1), 'CENTER'),
+        ('ALIGN', (0,0), (0,-1), 'LEFT'), # Left align metric column
+        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
+        ('BOTTOMPADDING', (0,0), (-1,0), 6),
+        ('BACKGROUND', (0,1), (-1,-1), colors.white),
+        ('FONTSIZE', (0,0), (-1,-1), 8), # Smaller font for more compact table
+        ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
+    ])
+
+    year_wise_table = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#D3D3D3')),
+        ('GRID', (0,0), (-1,-1), 0.5, colors.black),
+        ('ALIGN', (0,0), (-1,-1), 'CENTER'),
+        ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
+        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
+        ('BOTTOMPADDING', (0,0), (-1,0), 4),
+        ('BACKGROUND', (0,1), (-1,-1), colors.white),
+        ('FONTSIZE', (0,0), (-1,-1), 5) # VERY small font to try and fit
+    ])
+
+    return PdfStyles(paragraphs, input_table, comparison_table, year_wise_table)
+
+
+def calculate_emi(principal, rate, tenure_years):
+    """Calculate EMI using the standard formula"""
+    # Basic input validation
+    if principal < 0 or rate < 0 or tenure_years < 0:
+        raise ValueError("Principal, rate, and tenure must be non-negative.")
+
+    if principal == 0:
+        return 0
+
+    months = tenure_years * 12
+    if rate == 0:
+        # If rate is 0, EMI is simply principal / months. Handle division by zero for months.
+        return principal / months if months > 0 else principal
+
+    monthly_rate = rate / (12 * 100)
+    try:
+        growth = (1 + monthly_rate) ** months
+        emi = principal * monthly_rate * growth / (growth - 1)
+    except OverflowError as e:
+        raise ValueError("EMI calculation resulted in an overflow. Check your inputs (e.g., extremely high rate or tenure).") from e
+    except ZeroDivisionError as e:
+        raise ValueError("EMI calculation resulted in division by zero. Check your inputs (e.g., monthly rate leading to zero denominator).") from e
+        
+    return emi
 
-# For PDF generation
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle # Import ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.lib import colors
-from reportlab.lib.enums import TA_CENTER, TA_LEFT
-
-# Set a consistent style for matplotlib plots
-plt.style.use('seaborn-v0_8')
-
-class ProjectFinancingCalculator:
-    def __init__(self):
-        self.investment_options = {
-            'FD': {
-                'default_return': 7.0,
-                'liquidity': 'Medium',
-                'tax_efficiency': 'Taxed at slab rate',
-                'compounding': 'quarterly',
-                'notes': 'Safe, insured up to ₹5L'
-            },
-            'Liquid Funds': {
-                'default_return': 6.75,
-                'liquidity': 'High (T+1)',
-                'tax_efficiency': 'Lower tax if held > 3 years',
-                'compounding': 'daily',
-                'notes': 'Great for idle cash, corporate treasuries'
-            },
-            'SGBs': {
-                'default_return': 2.5,
-                'liquidity': '8-year lock-in',
-                'tax_efficiency': 'Tax-free maturity gains',
-                'compounding': 'annual',
-                'notes': 'Hedge + tax-free if held full term'
-            },
-            'Arbitrage Fund': {
-                'default_return': 7.0,
-                'liquidity': 'High (T+1)',
-                'tax_efficiency': 'Equity taxation (10% after 1 yr)',
-                'compounding': 'daily',
-                'notes': 'Good for high net-worth safety seekers'
-            },
-            'Debt Funds': {
-                'default_return': 7.5,
-                'liquidity': 'Medium',
-                'tax_efficiency': 'Debt tax rules (indexation gone)',
-                'compounding': 'daily',
-                'notes': 'Slightly better than FD on return'
-            }
-        }
-
-    def calculate_emi(self, principal, rate, tenure_years):
-        """Calculate EMI using the standard formula"""
-        # Basic input validation
-        if principal < 0 or rate < 0 or tenure_years < 0:
-            st.error("Principal, rate, and tenure must be non-negative.")
-            return 0
-
-        if principal == 0:
-            return 0
-
-        monthly_rate = rate / (12 * 100)
-        months = tenure_years * 12
-
-        if rate == 0:
-            # If rate is 0, EMI is simply principal / months. Handle division by zero for months.
-            return principal / months if months > 0 else principal
 
-        try:
-            emi = (principal * monthly_rate * math.pow(1 + monthly_rate, months)) / \
-                  (math.pow(1 + monthly_rate, months) - 1)
-        except OverflowError:
-            st.error("EMI calculation resulted in an overflow. Check your inputs (e.g., extremely high rate or tenure).")
-            return float('inf') # Indicate a very large EMI
-        except ZeroDivisionError:
-            st.error("EMI calculation resulted in division by zero. Check your inputs (e.g., monthly rate leading to zero denominator).")
-            return float('inf')
-            
-        return emi
-
-    def calculate_investment_growth(self, principal, annual_rate, years, compounding='quarterly'):
-        """Calculate investment growth with different compounding frequencies"""
-        # Basic input validation
-        if principal < 0 or annual_rate < 0 or years < 0:
-            st.error("Principal, annual rate, and years for investment must be non-negative.")
-            return 0
-
-        rate = annual_rate / 100
-
-        if compounding == 'daily':
-            return principal * math.pow(1 + rate/365, 365 * years)
-        elif compounding == 'quarterly':
-            return principal * math.pow(1 + rate/4, 4 * years)
-        elif compounding == 'monthly':
-            return principal * math.pow(1 + rate/12, 12 * years)
-        else:  # annual
-            return principal * math.pow(1 + rate, years)
-
-    def generate_year_wise_data(self, inputs, results):
-        """Generate year-wise breakdown for analysis"""
-        # Define column names explicitly for DataFrame creation
-        column_names = [
-            'Year',
-            'S1_Cumulative_Gross_Interest (Lakh)',
-            'S2_Cumulative_Gross_Interest (Lakh)',
-            'S3_Cumulative_Gross_Interest (Lakh)',
-            'S2_Investment_Value (Lakh)',
-            'S3_Investment_Value (Lakh)',
-            'S2_Investment_Gain (Lakh)',
-            'S3_Investment_Gain (Lakh)',
-            'S2_Post_Tax_Investment_Gain (Lakh)',
-            'S3_Post_Tax_Investment_Gain (Lakh)',
-            'S1_Cumulative_Net_Effective_Cost (Lakh)',
-            'S2_Cumulative_Net_Effective_Cost (Lakh)',
-            'S3_Cumulative_Net_Effective_Cost (Lakh)'
-        ]
-        data = []
+def calculate_investment_growth(principal, annual_rate, years, compounding='quarterly'):
+    """Calculate investment growth with different compounding frequencies"""
+    # Basic input validation
+    if principal < 0 or annual_rate < 0 or years < 0:
+        raise ValueError("Principal, annual rate, and years for investment must be non-negative.")
 
-        # Ensure project cost is consistently used for calculations (in actual rupees for EMI)
-        project_cost_actual = inputs['project_cost'] * 100000
-        own_capital_lakh = inputs['own_capital'] # Keep in Lakhs for investment growth
-        
-        # Calculate EMIs once for the full tenure to avoid recalculating in loop
-        # Scenario 1 Loan
-        scenario1_loan_amount_actual = max(0, inputs['project_cost'] - own_capital_lakh) * 100000
-        scenario1_emi = self.calculate_emi(scenario1_loan_amount_actual, inputs['loan_rate'], inputs['loan_tenure'])
-
-        # Scenario 2 Loan
-        scenario2_loan_amount_actual = inputs['project_cost'] * 100000
-        scenario2_emi = self.calculate_emi(scenario2_loan_amount_actual, inputs['loan_rate'], inputs['loan_tenure'])
-
-        # Scenario 3 Loan
-        scenario3_capital_used_lakh = inputs['custom_capital_contribution']
-        scenario3_loan_amount_actual = max(0, inputs['project_cost'] - scenario3_capital_used_lakh) * 100000
-        scenario3_emi = self.calculate_emi(scenario3_loan_amount_actual, inputs['loan_rate'], inputs['loan_tenure'])
-        
-        scenario3_remaining_own_capital_lakh = own_capital_lakh - scenario3_capital_used_lakh
-
-
-        for year in range(inputs['loan_tenure'] + 1):
-            # Scenario 1: Maximum Own Funding
-            if year == 0:
-                s1_gross_interest_cumulative = 0
-                s1_net_effective_cost_cumulative = inputs['project_cost'] # Only project cost at year 0
-            else:
-                s1_total_paid_cumulative = scenario1_emi * 12 * year
-                s1_principal_paid_cumulative = min(s1_total_paid_cumulative, scenario1_loan_amount_actual)
-                s1_gross_interest_cumulative = max(0, s1_total_paid_cumulative - s1_principal_paid_cumulative) / 100000 # Convert to lakh
-                
-                s1_effective_interest_cumulative = s1_gross_interest_cumulative
-                if inputs['loan_interest_deductible']:
-                    s1_effective_interest_cumulative *= (1 - inputs['tax_rate']/100)
-                s1_net_effective_cost_cumulative = inputs['project_cost'] + s1_effective_interest_cumulative
-
-
-            # Scenario 2: Maximum Leverage
-            if year == 0:
-                s2_gross_interest_cumulative = 0
-                s2_investment_value = own_capital_lakh # Initial investment value
-                s2_investment_gain = 0
-                s2_post_tax_gain = 0
-                s2_net_effective_cost_cumulative = inputs['project_cost'] # Only project cost at year 0
-            else:
-                s2_total_paid_cumulative = scenario2_emi * 12 * year
-                s2_principal_paid_cumulative = min(s2_total_paid_cumulative, scenario2_loan_amount_actual)
-                s2_gross_interest_cumulative = max(0, s2_total_paid_cumulative - s2_principal_paid_cumulative) / 100000 # Convert to lakh
-
-                s2_effective_interest_cumulative = s2_gross_interest_cumulative
-                if inputs['loan_interest_deductible']:
-                    s2_effective_interest_cumulative *= (1 - inputs['tax_rate']/100)
-                
-                s2_investment_value = self.calculate_investment_growth(
-                    own_capital_lakh,
-                    inputs['investment_return'],
-                    year,
-                    self.investment_options[inputs['investment_type']]['compounding']
-                )
-                s2_investment_gain = s2_investment_value - own_capital_lakh
-                s2_post_tax_gain = s2_investment_gain * (1 - inputs['tax_rate']/100)
-                
-                s2_net_effective_cost_cumulative = inputs['project_cost'] + s2_effective_interest_cumulative - s2_post_tax_gain
-
-
-            # Scenario 3: Balanced Approach
-            if year == 0:
-                s3_gross_interest_cumulative = 0
-                s3_investment_value = scenario3_remaining_own_capital_lakh if scenario3_remaining_own_capital_lakh > 0 else 0
-                s3_investment_gain = 0
-                s3_post_tax_gain = 0
-                s3_net_effective_cost_cumulative = inputs['project_cost'] # Only project cost at year 0
-            else:
-                s3_total_paid_cumulative = scenario3_emi * 12 * year
-                s3_principal_paid_cumulative = min(s3_total_paid_cumulative, scenario3_loan_amount_actual)
-                s3_gross_interest_cumulative = max(0, s3_total_paid_cumulative - s3_principal_paid_cumulative) / 100000 # Convert to lakh
-
-                s3_effective_interest_cumulative = s3_gross_interest_cumulative
-                if inputs['loan_interest_deductible']:
-                    s3_effective_interest_cumulative *= (1 - inputs['tax_rate']/100)
-
-                s3_investment_value = scenario3_remaining_own_capital_lakh # Initial value if no growth
-                if scenario3_remaining_own_capital_lakh > 0: # Ensure there was capital to invest (corrected variable name)
-                    s3_investment_value = self.calculate_investment_growth(
-                        scenario3_remaining_own_capital_lakh,
-                        inputs['investment_return'],
-                        year,
-                        self.investment_options[inputs['investment_type']]['compounding']
-                    )
-                s3_investment_gain = s3_investment_value - scenario3_remaining_own_capital_lakh
-                s3_post_tax_gain = s3_investment_gain * (1 - inputs['tax_rate']/100)
-                
-                s3_net_effective_cost_cumulative = inputs['project_cost'] + s3_effective_interest_cumulative - s3_post_tax_gain
-
-
-            data.append([
-                year,
-                s1_gross_interest_cumulative,
-                s2_gross_interest_cumulative,
-                s3_gross_interest_cumulative,
-                s2_investment_value,
-                s3_investment_value,
-                s2_investment_gain,
-                s3_investment_gain,
-                s2_post_tax_gain,
-                s3_post_tax_gain,
-                s1_net_effective_cost_cumulative,
-                s2_net_effective_cost_cumulative,
-                s3_net_effective_cost_cumulative
-            ])
-
-        # Create DataFrame with explicit column names
-        return pd.DataFrame(data, columns=column_names)
-
-    def calculate_comparison(self, inputs):
-        """Main calculation function to compare the three financing scenarios."""
-        # Input validation for key parameters
-        if not all(k in inputs for k in ['project_cost', 'own_capital', 'loan_rate', 'loan_tenure', 'tax_rate', 'investment_return', 'custom_capital_contribution']):
-            st.error("Missing required input parameters for calculation.")
-            return {} # Return empty dict or raise error
-        
-        if inputs['project_cost'] <= 0:
-            st.error("Project cost must be greater than zero.")
-            return {}
-        if inputs['loan_tenure'] <= 0:
-            st.error("Loan tenure must be greater than zero.")
-            return {}
-        if inputs['own_capital'] < 0 or inputs['loan_rate'] < 0 or inputs['investment_return'] < 0 or inputs['tax_rate'] < 0:
-            st.error("Financial rates and capital cannot be negative.")
-            return {}
-        if inputs['custom_capital_contribution'] < 0 or inputs['custom_capital_contribution'] > inputs['own_capital']:
-            st.error("Custom capital contribution must be non-negative and not exceed total own capital.")
-            return {}
-
-        # --- Scenario 1: Maximum Own Funding ---
-        # Description: Use your money first to minimize loan.
-        s1_capital_used_directly_lakh = min(inputs['project_cost'], inputs['own_capital'])
-        s1_loan_amount_lakh = max(0, inputs['project_cost'] - s1_capital_used_directly_lakh)
-        s1_loan_amount_actual = s1_loan_amount_lakh * 100000 # Convert to actual amount for EMI calc
-
-        s1_emi = self.calculate_emi(s1_loan_amount_actual, inputs['loan_rate'], inputs['loan_tenure'])
-        s1_total_loan_payment = s1_emi * 12 * inputs['loan_tenure']
-        s1_gross_total_interest = s1_total_loan_payment - s1_loan_amount_actual
-        
-        # Apply tax deductibility for loan interest
-        s1_effective_total_interest = s1_gross_total_interest
-        if inputs['loan_interest_deductible']:
-            s1_effective_total_interest *= (1 - inputs['tax_rate']/100)
-        
-        s1_gross_total_interest_lakh = s1_gross_total_interest / 100000
-        s1_effective_total_interest_lakh = s1_effective_total_interest / 100000
-
-        # Net Effective Cost: Project Cost + Effective Total Interest (no investment gains here)
-        s1_net_effective_cost = inputs['project_cost'] + s1_effective_total_interest_lakh
-
-        # --- Scenario 2: Maximum Leverage ---
-        # Description: Take a loan for the entire project cost and invest all your available own capital.
-        s2_capital_used_directly_lakh = 0.0 # No own capital used directly for project
-        s2_capital_invested_lakh = inputs['own_capital']
-        s2_loan_amount_lakh = inputs['project_cost']
-        s2_loan_amount_actual = s2_loan_amount_lakh * 100000 # Convert to actual amount for EMI calc
-
-        s2_emi = self.calculate_emi(s2_loan_amount_actual, inputs['loan_rate'], inputs['loan_tenure'])
-        s2_total_loan_payment = s2_emi * 12 * inputs['loan_tenure']
-        s2_gross_total_interest = s2_total_loan_payment - s2_loan_amount_actual
-        
-        # Apply tax deductibility for loan interest
-        s2_effective_total_interest = s2_gross_total_interest
-        if inputs['loan_interest_deductible']:
-            s2_effective_total_interest *= (1 - inputs['tax_rate']/100)
-        
-        s2_gross_total_interest_lakh = s2_gross_total_interest / 100000
-        s2_effective_total_interest_lakh = s2_effective_total_interest / 100000
-
-        # Investment calculations for Scenario 2
-        s2_investment_maturity_value_lakh = self.calculate_investment_growth(
-            s2_capital_invested_lakh,
-            inputs['investment_return'],
-            inputs['loan_tenure'],
-            self.investment_options[inputs['investment_type']]['compounding']
+    rate = annual_rate / 100
+    periods = COMPOUNDING_PERIODS_PER_YEAR.get(compounding, 1)  # anything else compounds annually
+
+    return principal * (1 + rate/periods) ** (periods * years)
+
+
+def _cumulative_interest(years, loan_amount, emi, monthly_rate):
+    """Closed-form cumulative loan interest paid by the end of each of `years` (same units as `loan_amount`).
+
+    Every year is computed independently from the outstanding balance formula,
+    so there is no state carried from one year to the next. `loan_amount` and
+    `emi` may be column arrays to evaluate several loans at once.
+    """
+    months = 12 * years
+    if monthly_rate == 0:
+        outstanding = loan_amount - emi * months
+    else:
+        growth = np.power(1 + monthly_rate, months)
+        outstanding = loan_amount * growth - emi * (growth - 1) / monthly_rate
+    # Analytically non-negative for 0 <= months <= tenure, but floating-point residue can dip just below zero
+    return emi * months - (loan_amount - outstanding)
+
+
+def generate_year_wise_data(inputs, results):
+    """Generate year-wise breakdown for analysis"""
+    # Key the cache on just what the table depends on, so changing a display-only
+    # input (loan type, liquidity target, prepayment penalty, ...) reuses the cached frame.
+    # Own and custom capital only matter through the per-scenario figures.
+    year_wise_inputs = replace(
+        inputs, own_capital=0.0, custom_capital_contribution=0.0, prepayment_penalty_pct=0.0,
+        loan_type='', min_liquidity_target=0.0, custom_capital_input_type='', custom_capital_percentage=0.0
+    )
+    scenario_figures = tuple((s.loan_amount, s.emi, s.capital_invested) for s in results.scenarios)
+    return _year_wise_data(year_wise_inputs, scenario_figures)
+
+
+@st.cache_data(show_spinner=False, max_entries=200)
+def _year_wise_data(inputs, scenario_figures):
+    """Year-wise table for the (loan amount, EMI, capital invested) of each scenario. Cached per input set."""
+    years = np.arange(inputs.loan_tenure + 1)
+    monthly_rate = inputs.loan_rate / (12 * 100)
+    post_tax_factor = 1 - inputs.tax_rate/100
+    interest_factor = post_tax_factor if inputs.loan_interest_deductible else 1
+
+    # Investment value after `year` years is principal * growth_factor_per_year ** year
+    periods = COMPOUNDING_PERIODS_PER_YEAR[INVESTMENT_OPTIONS[inputs.investment_type].compounding]
+    growth_factor_per_year = (1 + inputs.investment_return / (100 * periods)) ** periods
+    investment_growth = np.power(growth_factor_per_year, years)
+
+    # Stack the three scenarios so every formula runs once over a (scenario, year) grid
+    loans, emis, invested = np.array(scenario_figures).T
+    emis = emis / LAKH
+
+    # Cumulative gross interest in lakhs, floored at zero so rounding residue never displays as -0.00
+    gross_interest = np.maximum(_cumulative_interest(years, loans[:, None], emis[:, None], monthly_rate), 0.0)
+    investment_value = invested[:, None] * investment_growth
+    investment_gain = investment_value - invested[:, None]
+    post_tax_gain = investment_gain * post_tax_factor
+    net_effective_cost = inputs.project_cost + gross_interest * interest_factor - post_tax_gain
+
+    return pd.DataFrame({
+        'Year': years,
+        'S1_Cumulative_Gross_Interest (Lakh)': gross_interest[0],
+        'S2_Cumulative_Gross_Interest (Lakh)': gross_interest[1],
+        'S3_Cumulative_Gross_Interest (Lakh)': gross_interest[2],
+        'S2_Investment_Value (Lakh)': investment_value[1],
+        'S3_Investment_Value (Lakh)': investment_value[2],
+        'S2_Investment_Gain (Lakh)': investment_gain[1],
+        'S3_Investment_Gain (Lakh)': investment_gain[2],
+        'S2_Post_Tax_Investment_Gain (Lakh)': post_tax_gain[1],
+        'S3_Post_Tax_Investment_Gain (Lakh)': post_tax_gain[2],
+        'S1_Cumulative_Net_Effective_Cost (Lakh)': net_effective_cost[0],
+        'S2_Cumulative_Net_Effective_Cost (Lakh)': net_effective_cost[1],
+        'S3_Cumulative_Net_Effective_Cost (Lakh)': net_effective_cost[2]
+    })
+
+
+def _evaluate_scenario(inputs, description, capital_used_directly, capital_invested):
+    """ScenarioResult for one split of own capital between the project and the investment."""
+    project_cost = inputs.project_cost
+    tenure = inputs.loan_tenure
+    post_tax_factor = 1 - inputs.tax_rate/100
+
+    loan_amount_lakh = max(0, project_cost - capital_used_directly)
+
+    # The EMI formula is linear in the principal, so it can run in lakhs too
+    emi_lakh = calculate_emi(loan_amount_lakh, inputs.loan_rate, tenure)
+    total_loan_payment_lakh = emi_lakh * 12 * tenure
+    gross_total_interest_lakh = total_loan_payment_lakh - loan_amount_lakh
+
+    # Apply tax deductibility for loan interest
+    effective_total_interest_lakh = gross_total_interest_lakh
+    if inputs.loan_interest_deductible:
+        effective_total_interest_lakh *= post_tax_factor
+
+    # Investment calculations for any own capital not used directly
+    investment_maturity_value_lakh = 0.0
+    investment_gain_lakh = 0.0
+    post_tax_gain_lakh = 0.0
+    if capital_invested > 0:
+        investment_maturity_value_lakh = calculate_investment_growth(
+            capital_invested,
+            inputs.investment_return,
+            tenure,
+            INVESTMENT_OPTIONS[inputs.investment_type].compounding
         )
-        s2_investment_gain_lakh = s2_investment_maturity_value_lakh - s2_capital_invested_lakh
-        s2_post_tax_gain_lakh = s2_investment_gain_lakh * (1 - inputs['tax_rate']/100)
-
-        # Net Effective Cost: Project Cost + Effective Total Interest - Post-Tax Investment Gains
-        s2_net_effective_cost = inputs['project_cost'] + s2_effective_total_interest_lakh - s2_post_tax_gain_lakh
-
-        # --- Scenario 3: Balanced Approach ---
-        # Description: Contribute a custom amount of own capital directly, and take a loan for the rest. Invest any remaining own capital.
-        s3_capital_used_directly_lakh = inputs['custom_capital_contribution']
-        s3_remaining_own_capital_invested_lakh = max(0, inputs['own_capital'] - s3_capital_used_directly_lakh)
-        s3_loan_amount_lakh = max(0, inputs['project_cost'] - s3_capital_used_directly_lakh)
-        s3_loan_amount_actual = s3_loan_amount_lakh * 100000
-
-        s3_emi = self.calculate_emi(s3_loan_amount_actual, inputs['loan_rate'], inputs['loan_tenure'])
-        s3_total_loan_payment = s3_emi * 12 * inputs['loan_tenure']
-        s3_gross_total_interest = s3_total_loan_payment - s3_loan_amount_actual
-        
-        # Apply tax deductibility for loan interest
-        s3_effective_total_interest = s3_gross_total_interest
-        if inputs['loan_interest_deductible']:
-            s3_effective_total_interest *= (1 - inputs['tax_rate']/100)
-        
-        s3_gross_total_interest_lakh = s3_gross_total_interest / 100000
-        s3_effective_total_interest_lakh = s3_effective_total_interest / 100000
-
-        # Calculate investment for remaining own capital (if any) for Scenario 3
-        s3_investment_maturity_value_lakh = 0
-        s3_investment_gain_lakh = 0
-        s3_post_tax_gain_lakh = 0
-
-        if s3_remaining_own_capital_invested_lakh > 0:
-            s3_investment_maturity_value_lakh = self.calculate_investment_growth(
-                s3_remaining_own_capital_invested_lakh,
-                inputs['investment_return'],
-                inputs['loan_tenure'],
-                self.investment_options[inputs['investment_type']]['compounding']
-            )
-            s3_investment_gain_lakh = s3_investment_maturity_value_lakh - s3_remaining_own_capital_invested_lakh
-            s3_post_tax_gain_lakh = s3_investment_gain_lakh * (1 - inputs['tax_rate']/100)
-
-        # Net Effective Cost: Project Cost + Effective Total Interest - Post-Tax Investment Gains
-        s3_net_effective_cost = inputs['project_cost'] + s3_effective_total_interest_lakh - s3_post_tax_gain_lakh
-
-        # --- Overall Metrics & Recommendation ---
-        # Calculate annualized effective rates for display
-        effective_loan_rate_annual = inputs['loan_rate']
-        if inputs['loan_interest_deductible']:
-            effective_loan_rate_annual = inputs['loan_rate'] * (1 - inputs['tax_rate']/100)
-
-        effective_investment_return_annual = 0
-        if inputs['own_capital'] > 0 and inputs['loan_tenure'] > 0:
-            # Calculate CAGR for Scenario 2's investment (using post-tax maturity value)
-            if s2_investment_maturity_value_lakh > 0 and s2_capital_invested_lakh > 0:
-                effective_investment_return_annual = ( (s2_investment_maturity_value_lakh / s2_capital_invested_lakh)**(1/inputs['loan_tenure']) - 1 ) * 100
-
-        # Determine recommendation based on Net Effective Cost
-        all_net_effective_costs = {
-            'scenario1': s1_net_effective_cost,
-            'scenario2': s2_net_effective_cost,
-            'scenario3': s3_net_effective_cost
-        }
-        
-        min_net_effective_cost_value = min(all_net_effective_costs.values())
-        
-        recommendation = ''
-        for key, value in all_net_effective_costs.items():
-            if value == min_net_effective_cost_value:
-                recommendation = key
-                break # Found the first matching scenario
-
-        max_net_effective_cost_value = max(all_net_effective_costs.values())
-        savings_against_worst = max_net_effective_cost_value - min_net_effective_cost_value
-
-        # Calculate prepayment penalty (assuming on initial loan amount of Scenario 2 for illustration)
-        prepayment_cost = 0
-        # If the loan is fully prepaid immediately, it's on the full loan amount
-        # For a more accurate calculation, one would need to know the outstanding principal at time of prepayment
-        # For simplicity here, we'll calculate based on the initial project cost
-        if inputs['prepayment_penalty_pct'] > 0:
-            prepayment_cost = (inputs['project_cost'] * inputs['prepayment_penalty_pct'] / 100)
-
-
-        # Compile results dictionary
-        results = {
-            'scenario1': {
-                'description': 'Maximum Own Funding: Use your money first to minimize loan.',
-                'capital_used_directly': s1_capital_used_directly_lakh,
-                'loan_amount': s1_loan_amount_lakh,
-                'emi': s1_emi,
-                'total_gross_loan_payments': s1_total_loan_payment, # Keep this for internal calculation if needed, but not displayed as a primary metric
-                'gross_total_interest': s1_gross_total_interest_lakh,
-                'effective_total_interest': s1_effective_total_interest_lakh,
-                'net_effective_cost': s1_net_effective_cost
-            },
-            'scenario2': {
-                'description': 'Maximum Leverage: Take a loan for the entire project cost and invest all your available own capital.',
-                'capital_used_directly': s2_capital_used_directly_lakh,
-                'capital_invested': s2_capital_invested_lakh,
-                'loan_amount': s2_loan_amount_lakh,
-                'emi': s2_emi,
-                'total_gross_loan_payments': s2_total_loan_payment,
-                'gross_total_interest': s2_gross_total_interest_lakh,
-                'effective_total_interest': s2_effective_total_interest_lakh,
-                'investment_maturity': s2_investment_maturity_value_lakh,
-                'investment_gain': s2_investment_gain_lakh,
-                'post_tax_gain': s2_post_tax_gain_lakh,
-                'net_effective_cost': s2_net_effective_cost
-            },
-            'scenario3': {
-                'description': 'Balanced Approach: Contribute a custom amount of own capital directly, and take a loan for the rest. Invest any remaining own capital.',
-                'capital_used_directly': s3_capital_used_directly_lakh,
-                'remaining_own_capital_invested': s3_remaining_own_capital_invested_lakh,
-                'loan_amount': s3_loan_amount_lakh,
-                'emi': s3_emi,
-                'total_gross_loan_payments': s3_total_loan_payment,
-                'gross_total_interest': s3_gross_total_interest_lakh,
-                'effective_total_interest': s3_effective_total_interest_lakh,
-                'investment_maturity': s3_investment_maturity_value_lakh,
-                'investment_gain': s3_investment_gain_lakh,
-                'post_tax_gain': s3_post_tax_gain_lakh,
-                'net_effective_cost': s3_net_effective_cost
-            },
-            'recommendation': recommendation,
-            'savings': savings_against_worst,
-            'interest_spread': inputs['loan_rate'] - inputs['investment_return'],
-            'effective_loan_rate_annual': effective_loan_rate_annual,
-            'effective_investment_return_annual': effective_investment_return_annual,
-            'prepayment_cost': prepayment_cost
-        }
-        
-        return results
-
-    def get_recommendation_text(self, results, inputs):
-        """Generate recommendation text considering 3 scenarios"""
-        interest_spread = results['interest_spread']
-        recommendation_scenario = results['recommendation']
-
-        base_text = ""
-        if recommendation_scenario == 'scenario1':
-            base_text = "💡 **Scenario 1 (Maximum Own Funding)** is recommended."
-            if results['scenario1']['loan_amount'] == 0:
-                base_text += " You have enough own capital to cover the entire project cost, eliminating the need for a loan."
-            else:
-                base_text += " This approach minimizes your loan burden by utilizing your own capital first."
-            if interest_spread > 3:
-                base_text += " The loan interest rate is significantly higher than potential investment returns, making direct funding more economical."
-            else:
-                base_text += " It offers better capital preservation with the lowest overall effective cost."
-
-        elif recommendation_scenario == 'scenario2':
-            base_text = "💡 **Scenario 2 (Maximum Leverage)** is recommended."
-            base_text += " This strategy allows you to keep your own capital liquid and invested, potentially generating significant returns."
-            if interest_spread < -2:
-                base_text += " Your investment returns are substantially higher than your loan costs, leading to a net positive arbitrage."
-            else:
-                base_text += " It helps maintain maximum liquidity while still proving to be the most cost-effective option."
-
-        else: # recommendation_scenario == 'scenario3'
-            base_text = "💡 **Scenario 3 (Balanced Approach)** is recommended."
-            base_text += f" This option proposes using ₹{results['scenario3']['capital_used_directly']:.1f}L of your capital directly for the project, and investing the remaining ₹{results['scenario3']['remaining_own_capital_invested']:.1f}L."
-            if results['scenario3']['loan_amount'] == 0:
-                 base_text += " You can fully fund the project with your custom contribution, eliminating the loan, and still invest your remaining capital."
-            else:
-                base_text += " It offers the lowest effective cost by striking a balance between direct capital use and strategic investment of remaining funds."
-        
-        if inputs['loan_interest_deductible']:
-            base_text += f" (Note: Loan interest is considered tax-deductible, significantly reducing its effective cost.)"
-        
-        return base_text
-
-    def print_detailed_report(self, inputs, results):
-        """Print comprehensive analysis report using st.write"""
-        st.subheader("📊 Detailed Analysis")
-        st.markdown("---")
-
-        # Recommendation at the top
-        st.markdown("#### ✅ Recommendation:")
-        recommendation_text = self.get_recommendation_text(results, inputs)
-        st.success(recommendation_text)
-        st.write(f"**Potential Savings (compared to worst scenario):** ₹{results['savings']:.2f} lakh")
-        st.markdown("---")
-
-        # Tabular Comparison of Scenarios
-        st.markdown("#### 📈 Financing Scenarios Comparison")
-        comparison_data = {
-            'Metric': [
-                'Scenario Description',
-                'Own Capital Used for Project',
-                'Own Capital Available & Invested',
-                'Loan Amount Required',
-                'Monthly EMI',
-                'Gross Total Interest Paid (Loan)',
-                'Effective Total Interest (After Tax Benefits)',
-                'Total Investment Maturity Value',
-                'Total Post-Tax Investment Gain',
-                '**NET EFFECTIVE COST**'
-            ],
-            'Scenario 1: Maximum Own Funding': [
-                results['scenario1']['description'],
-                f"₹{results['scenario1']['capital_used_directly']:.1f} lakh",
-                "₹0.0 lakh",
-                f"₹{results['scenario1']['loan_amount']:.1f} lakh",
-                f"₹{results['scenario1']['emi']:,.0f}",
-                f"₹{results['scenario1']['gross_total_interest']:.1f} lakh",
-                f"₹{results['scenario1']['effective_total_interest']:.1f} lakh",
-                "₹0.0 lakh",
-                "₹0.0 lakh",
-                f"₹{results['scenario1']['net_effective_cost']:.2f} lakh"
-            ],
-            'Scenario 2: Maximum Leverage': [
-                results['scenario2']['description'],
-                f"₹{results['scenario2']['capital_used_directly']:.1f} lakh",
-                f"₹{results['scenario2']['capital_invested']:.1f} lakh",
-                f"₹{results['scenario2']['loan_amount']:.1f} lakh",
-                f"₹{results['scenario2']['emi']:,.0f}",
-                f"₹{results['scenario2']['gross_total_interest']:.1f} lakh",
-                f"₹{results['scenario2']['effective_total_interest']:.1f} lakh",
-                f"₹{results['scenario2']['investment_maturity']:.2f} lakh",
-                f"₹{results['scenario2']['post_tax_gain']:.2f} lakh",
-                f"₹{results['scenario2']['net_effective_cost']:.2f} lakh"
-            ],
-            'Scenario 3: Balanced Approach': [
-                results['scenario3']['description'],
-                f"₹{results['scenario3']['capital_used_directly']:.1f} lakh",
-                f"₹{results['scenario3']['remaining_own_capital_invested']:.1f} lakh",
-                f"₹{results['scenario3']['loan_amount']:.1f} lakh",
-                f"₹{results['scenario3']['emi']:,.0f}",
-                f"₹{results['scenario3']['gross_total_interest']:.1f} lakh",
-                f"₹{results['scenario3']['effective_total_interest']:.1f} lakh",
-                f"₹{results['scenario3']['investment_maturity']:.2f} lakh" if results['scenario3']['remaining_own_capital_invested'] > 0 else "₹0.0 lakh",
-                f"₹{results['scenario3']['post_tax_gain']:.2f} lakh" if results['scenario3']['remaining_own_capital_invested'] > 0 else "₹0.0 lakh",
-                f"₹{results['scenario3']['net_effective_cost']:.2f} lakh"
-            ]
-        }
-        comparison_df = pd.DataFrame(comparison_data).set_index('Metric')
-        st.dataframe(comparison_df)
-
-        # Definitions Expander (Updated)
-        with st.expander("❓ Understanding the Key Metric: Net Effective Cost"): 
-            st.markdown("""
-            Here's a breakdown of the core financial metric used in this analysis:
-            
-            **Net Effective Cost (True Economic Cost):**
-            This is the **ultimate financial burden** of funding the project, reflecting what the project *truly costs you* after accounting for all direct expenses, tax advantages, and investment benefits. It's calculated as:
-            `Net Effective Cost = Total Project Cost + Effective Total Loan Interest (After Tax) - Post-Tax Investment Gains`
-            
-            Let's break that down:
-            * **Total Project Cost:** The fundamental purchase or development cost of the project itself.
-            * **Effective Total Loan Interest (After Tax):** This is the total gross interest you pay on your loan, reduced by any tax savings if the loan interest is tax-deductible (based on your input Tax Rate). This provides the *actual* cost of borrowing.
-            * **Post-Tax Investment Gains:** If you invest your own capital, any profits earned from that investment (after taxes) are subtracted from your total cost. These gains effectively reduce the overall financial impact of the project on your net worth.
-            
-            This metric provides the most accurate "bottom-line" figure for each financing scenario, allowing for a direct and comparable evaluation of the real economic impact.
-            """)
-        st.markdown("---")
-
-        # Input Summary
-        st.markdown("#### 📋 Input Parameters Used:")
-        st.write(f"**Total Project Cost:** ₹{inputs['project_cost']:.1f} lakh")
-        st.write(f"**Own Capital Available:** ₹{inputs['own_capital']:.1f} lakh")
-        st.write(f"**Bank Loan Interest Rate:** {inputs['loan_rate']:.2f}% p.a. ({inputs['loan_type']})")
-        st.write(f"**Loan Tenure:** {inputs['loan_tenure']} years")
-        st.write(f"**Loan Interest Tax Deductible:** {'Yes' if inputs['loan_interest_deductible'] else 'No'}")
-        st.write(f"**Prepayment Penalty:** {inputs['prepayment_penalty_pct']:.2f}%")
-        st.write(f"**Minimum Liquidity Target:** ₹{inputs['min_liquidity_target']:.1f} lakh")
-        st.write(f"**Investment Type:** {inputs['investment_type']}")
-        st.write(f"**Investment Return:** {inputs['investment_return']:.2f}% p.a.")
-        st.write(f"**Tax Rate:** {inputs['tax_rate']:.0f}%")
+        investment_gain_lakh = investment_maturity_value_lakh - capital_invested
+        post_tax_gain_lakh = investment_gain_lakh * post_tax_factor
+
+    # Net Effective Cost: Project Cost + Effective Total Interest - Post-Tax Investment Gains
+    net_effective_cost = project_cost + effective_total_interest_lakh - post_tax_gain_lakh
+
+    return ScenarioResult(
+        description=description,
+        capital_used_directly=capital_used_directly,
+        capital_invested=capital_invested,
+        loan_amount=loan_amount_lakh,
+        emi=emi_lakh * LAKH, # Reported in rupees
+        total_gross_loan_payments=total_loan_payment_lakh,
+        gross_total_interest=gross_total_interest_lakh,
+        effective_total_interest=effective_total_interest_lakh,
+        investment_maturity=investment_maturity_value_lakh,
+        investment_gain=investment_gain_lakh,
+        post_tax_gain=post_tax_gain_lakh,
+        net_effective_cost=net_effective_cost
+    )
+
+
+def sweep_scenario3(inputs, capital_grid):
+    """Scenario 3 net effective cost (lakhs) for every custom capital contribution in `capital_grid`.
+
+    Same formulas as _evaluate_scenario, evaluated over the whole grid in one pass.
+    """
+    capital_grid = np.asarray(capital_grid, dtype=float)
+    project_cost = inputs.project_cost
+    post_tax_factor = 1 - inputs.tax_rate/100
+    months = inputs.loan_tenure * 12
+    monthly_rate = inputs.loan_rate / (12 * 100)
+
+    loan_amount_lakh = np.maximum(0, project_cost - capital_grid)
+    if monthly_rate == 0:
+        emi_lakh = loan_amount_lakh / months
+    else:
+        growth = (1 + monthly_rate) ** months
+        emi_lakh = loan_amount_lakh * monthly_rate * growth / (growth - 1)
+    effective_total_interest_lakh = emi_lakh * months - loan_amount_lakh
+    if inputs.loan_interest_deductible:
+        effective_total_interest_lakh *= post_tax_factor
+
+    capital_invested = np.maximum(0, inputs.own_capital - capital_grid)
+    investment_gain = calculate_investment_growth(
+        1.0,
+        inputs.investment_return,
+        inputs.loan_tenure,
+        INVESTMENT_OPTIONS[inputs.investment_type].compounding
+    ) * capital_invested - capital_invested
+    post_tax_gain = investment_gain * post_tax_factor
+
+    return project_cost + effective_total_interest_lakh - post_tax_gain
+
+
+@st.cache_data(show_spinner=False, max_entries=200)
+def calculate_comparison(inputs):
+    """Main calculation function to compare the three financing scenarios. Cached, keyed on the (frozen) inputs."""
+    project_cost = inputs.project_cost
+    own_capital = inputs.own_capital
+    loan_rate = inputs.loan_rate
+
+    # Input validation for key parameters
+    if project_cost <= 0:
+        raise ValueError("Project cost must be greater than zero.")
+    if inputs.loan_tenure <= 0:
+        raise ValueError("Loan tenure must be greater than zero.")
+    if own_capital < 0 or loan_rate < 0 or inputs.investment_return < 0 or inputs.tax_rate < 0:
+        raise ValueError("Financial rates and capital cannot be negative.")
+    if inputs.custom_capital_contribution < 0 or inputs.custom_capital_contribution > own_capital:
+        raise ValueError("Custom capital contribution must be non-negative and not exceed total own capital.")
+
+    # --- Scenario 1: Maximum Own Funding ---
+    # Description: Use your money first to minimize loan.
+    s1_capital_used_directly_lakh = min(project_cost, own_capital)
+    s1_results = _evaluate_scenario(inputs, SCENARIO_DESCRIPTIONS['scenario1'], s1_capital_used_directly_lakh, 0.0)
+
+    # --- Scenario 2: Maximum Leverage ---
+    # Description: Take a loan for the entire project cost and invest all your available own capital.
+    s2_capital_invested_lakh = own_capital
+
+    if math.isclose(s2_capital_invested_lakh, 0.0, abs_tol=CAPITAL_TOLERANCE):
+        # Nothing to invest: Scenario 2 borrows the full project cost exactly like Scenario 1
+        s2_results = replace(s1_results, description=SCENARIO_DESCRIPTIONS['scenario2'],
+                             capital_used_directly=0.0, capital_invested=0.0)
+    else:
+        # No own capital used directly for project
+        s2_results = _evaluate_scenario(inputs, SCENARIO_DESCRIPTIONS['scenario2'], 0.0, s2_capital_invested_lakh)
+
+    # --- Scenario 3: Balanced Approach ---
+    # Description: Contribute a custom amount of own capital directly, and take a loan for the rest. Invest any remaining own capital.
+    s3_capital_used_directly_lakh = inputs.custom_capital_contribution
+
+    # The custom contribution comes from a slider, so its end points make Scenario 3
+    # collapse into Scenario 1 (all own capital used) or Scenario 2 (none used).
+    if math.isclose(s3_capital_used_directly_lakh, own_capital, abs_tol=CAPITAL_TOLERANCE):
+        s3_results = replace(s1_results, description=SCENARIO_DESCRIPTIONS['scenario3'],
+                             capital_used_directly=s3_capital_used_directly_lakh, capital_invested=0.0)
+    elif math.isclose(s3_capital_used_directly_lakh, 0.0, abs_tol=CAPITAL_TOLERANCE):
+        s3_results = replace(s2_results, description=SCENARIO_DESCRIPTIONS['scenario3'],
+                             capital_used_directly=s3_capital_used_directly_lakh)
+    else:
+        s3_remaining_own_capital_invested_lakh = max(0, own_capital - s3_capital_used_directly_lakh)
+        s3_results = _evaluate_scenario(inputs, SCENARIO_DESCRIPTIONS['scenario3'],
+                                        s3_capital_used_directly_lakh, s3_remaining_own_capital_invested_lakh)
+
+    # --- Overall Metrics & Recommendation ---
+    # Calculate annualized effective rates for display
+    effective_loan_rate_annual = loan_rate
+    if inputs.loan_interest_deductible:
+        effective_loan_rate_annual = loan_rate * (1 - inputs.tax_rate/100)
+
+    effective_investment_return_annual = 0
+    if s2_results.capital_invested > 0:
+        # CAGR of Scenario 2's investment: the compounding growth over a single year
+        periods = COMPOUNDING_PERIODS_PER_YEAR[INVESTMENT_OPTIONS[inputs.investment_type].compounding]
+        effective_investment_return_annual = ((1 + inputs.investment_return / (100 * periods)) ** periods - 1) * 100
+
+    # Determine recommendation based on Net Effective Cost (the first scenario wins a tie)
+    net_effective_costs = (s1_results.net_effective_cost, s2_results.net_effective_cost, s3_results.net_effective_cost)
+    best_index = min(range(len(SCENARIO_KEYS)), key=net_effective_costs.__getitem__)
+    recommendation = Scenario(best_index)
+    savings_against_worst = max(net_effective_costs) - net_effective_costs[best_index]
+
+    # Calculate prepayment penalty (assuming on initial loan amount of Scenario 2 for illustration)
+    prepayment_cost = 0
+    # If the loan is fully prepaid immediately, it's on the full loan amount
+    # For a more accurate calculation, one would need to know the outstanding principal at time of prepayment
+    # For simplicity here, we'll calculate based on the initial project cost
+    if inputs.prepayment_penalty_pct > 0:
+        prepayment_cost = (project_cost * inputs.prepayment_penalty_pct / 100)
+
+
+    return ComparisonResults(
+        scenario1=s1_results,
+        scenario2=s2_results,
+        scenario3=s3_results,
+        recommendation=recommendation,
+        savings=savings_against_worst,
+        interest_spread=inputs.loan_rate - inputs.investment_return,
+        effective_loan_rate_annual=effective_loan_rate_annual,
+        effective_investment_return_annual=effective_investment_return_annual,
+        prepayment_cost=prepayment_cost
+    )
+
+
+def _max_own_funding_text(results):
+    text = "💡 **Scenario 1 (Maximum Own Funding)** is recommended."
+    if results.scenario1.loan_amount == 0:
+        text += " You have enough own capital to cover the entire project cost, eliminating the need for a loan."
+    else:
+        text += " This approach minimizes your loan burden by utilizing your own capital first."
+    if results.interest_spread > 3:
+        text += " The loan interest rate is significantly higher than potential investment returns, making direct funding more economical."
+    else:
+        text += " It offers better capital preservation with the lowest overall effective cost."
+    return text
+
+
+def _max_leverage_text(results):
+    text = "💡 **Scenario 2 (Maximum Leverage)** is recommended."
+    text += " This strategy allows you to keep your own capital liquid and invested, potentially generating significant returns."
+    if results.interest_spread < -2:
+        text += " Your investment returns are substantially higher than your loan costs, leading to a net positive arbitrage."
+    else:
+        text += " It helps maintain maximum liquidity while still proving to be the most cost-effective option."
+    return text
+
+
+def _balanced_text(results):
+    text = "💡 **Scenario 3 (Balanced Approach)** is recommended."
+    text += f" This option proposes using ₹{results.scenario3.capital_used_directly:.1f}L of your capital directly for the project, and investing the remaining ₹{results.scenario3.capital_invested:.1f}L."
+    if results.scenario3.loan_amount == 0:
+        text += " You can fully fund the project with your custom contribution, eliminating the loan, and still invest your remaining capital."
+    else:
+        text += " It offers the lowest effective cost by striking a balance between direct capital use and strategic investment of remaining funds."
+    return text
+
+
+_RECOMMENDATION_TEXT = {
+    Scenario.MAX_OWN_FUNDING: _max_own_funding_text,
+    Scenario.MAX_LEVERAGE: _max_leverage_text,
+    Scenario.BALANCED: _balanced_text
+}
+
+
+def get_recommendation_text(results, inputs):
+    """Generate recommendation text considering 3 scenarios"""
+    base_text = _RECOMMENDATION_TEXT[results.recommendation](results)
+
+    if inputs.loan_interest_deductible:
+        base_text += f" (Note: Loan interest is considered tax-deductible, significantly reducing its effective cost.)"
+    
+    return base_text
+
+
+def scenario_comparison_values(results):
+    """Numeric scenario comparison table: one row per COMPARISON_METRICS entry, one column per scenario."""
+    return np.array([
+        [
+            s.capital_used_directly, s.capital_invested, s.loan_amount, s.emi,
+            s.gross_total_interest, s.effective_total_interest,
+            s.investment_maturity, s.post_tax_gain, s.net_effective_cost
+        ]
+        for s in results.scenarios
+    ], dtype=float).T
+
+
+def _format_scenarios(results):
+    """Scenario comparison values formatted with the COMPARISON_METRICS formats, keyed by scenario name."""
+    formats = [value_format for _, value_format in COMPARISON_METRICS]
+    return {
+        scenario_name: [value_format.format(value) for value_format, value in zip(formats, column)]
+        for scenario_name, column in zip(SCENARIO_NAMES, scenario_comparison_values(results).T)
+    }
+
+
+def _render_comparison_markdown(metrics, scenario_values, row_header='Metric'):
+    """Markdown pipe-table with one row per metric and one column per scenario."""
+    lines = [
+        f'| {row_header} | ' + ' | '.join(scenario_values) + ' |',
+        '|---' * (len(scenario_values) + 1) + '|'
+    ]
+    for metric, *row in zip(metrics, *scenario_values.values()):
+        lines.append(f"| {metric} | " + ' | '.join(row) + ' |')
+    return '\n'.join(lines)
+
+
+def _input_summary_rows(inputs):
+    """(parameter, formatted value) pairs for the input summary, shared by the on-screen report and the PDF."""
+    deductible = 'Yes' if inputs.loan_interest_deductible else 'No'
+    custom_capital_format = CUSTOM_CAPITAL_FORMATS[inputs.custom_capital_input_type == 'Value (Lakhs)'] # Match the radio button label exactly
+    return [
+        (parameter, value_format.format(inputs, deductible=deductible))
+        for parameter, value_format in (*INPUT_SUMMARY_FORMATS, ('Custom Capital Contribution (Scenario 3)', custom_capital_format))
+    ]
+
+
+def _investment_detail_lines(investment_type, html=False):
+    """Bullet lines describing an investment type, as Markdown or as ReportLab HTML."""
+    details = INVESTMENT_OPTIONS[investment_type]
+    bold = "<b>{}:</b>" if html else "**{}:**"
+    return tuple(
+        f" - {bold.format(label)} {value}"
+        for label, value in (('Liquidity', details.liquidity), ('Tax Efficiency', details.tax_efficiency),
+                             ('Compounding', details.compounding), ('Notes', details.notes))
+    )
+
+
+@st.cache_data(ttl=3600, max_entries=128, show_spinner=False)
+def _build_report_payload(inputs, results):
+    """All input- and result-dependent report text, formatted once per unique (inputs, results)."""
+    metric_names = [metric for metric, _ in COMPARISON_METRICS]
+    parameters, values = zip(*_input_summary_rows(inputs))
+    if inputs.loan_interest_deductible:
+        tax_planning = " - **Tax Planning:** Loan interest is considered tax-deductible, significantly reducing the effective cost of borrowing. Ensure proper documentation for claiming this deduction."
+    else:
+        tax_planning = " - **Tax Planning:** Loan interest is NOT considered tax-deductible, meaning the gross interest is the effective cost. Explore other tax optimization strategies."
+    return {
+        'recommendation': get_recommendation_text(results, inputs),
+        'savings': f"**Potential Savings (compared to worst scenario):** ₹{results.savings:.2f} lakh",
+        'scenario_descriptions': '\n\n'.join(
+            f"**{scenario_name}** - {scenario.description}"
+            for scenario_name, scenario in zip(SCENARIO_NAMES, results.scenarios)
+        ),
+        'comparison_table': _render_comparison_markdown(metric_names, _format_scenarios(results)),
+        'input_summary': _render_comparison_markdown(parameters, {'Value': values}, row_header='Parameter'),
+        'investment_details': '\n'.join(_investment_detail_lines(inputs.investment_type)),
+        'key_metrics': KEY_METRICS_TEMPLATE.format(
+            loan_rate=results.effective_loan_rate_annual,
+            investment_return=results.effective_investment_return_annual,
+            spread=results.interest_spread
+        ),
+        'risks': '\n'.join((
+            f" - **Loan Interest Rate Risk:** The loan is **{inputs.loan_type}**. If floating, consider sensitivity to rate hikes and build in buffers.",
+            f" - **Prepayment Cost:** A {inputs.prepayment_penalty_pct:.2f}% penalty on a full loan (Scenario 2) would be **₹{results.prepayment_cost:.2f} lakh**. Factor this into early exit scenarios and loan terms.",
+            " - **Investment Volatility:** Assumed investment returns are estimates. Stress test your plan with $\\pm 1-2\\%$ returns to understand the impact on net effective cost and liquidity.",
+            f" - **Liquidity Buffer:** Your target minimum liquidity is **₹{inputs.min_liquidity_target:.1f} lakh**. Ensure the chosen option consistently maintains this, especially under stressed cash flow scenarios (e.g., delayed project revenue, unexpected expenses)."
+        )),
+        'strategic_considerations': '\n'.join((
+            tax_planning,
+            " - **Credit Profile & Leverage:** Assess the impact of increased debt on your company's debt-to-equity ratio, credit rating, and future borrowing capacity. Excessive leverage can affect banking relationships and future funding flexibility.",
+            " - **Regulatory Compliance:** Confirm all documentation (project reports, audited financials) are ready for smooth loan disbursal and subsequent annual reviews to avoid penalties or delays.",
+            " - **Investment Liquidity/Market Risk:** Even 'liquid' investments carry some market risk (e.g., temporary impairment during market freezes). Maintain an emergency buffer in a highly liquid bank account (beyond investment) for immediate needs.",
+            " - **Optimization Moves & Additional Value Levers:** Consider phased loan drawdown or capital deployment strategies to minimize idle funds and optimize interest costs or investment gains."
+        ))
+    }
+
+
+def print_detailed_report(inputs, results):
+    """Print comprehensive analysis report; the text itself comes from the cached _build_report_payload"""
+    report = _build_report_payload(inputs, results)
+
+    st.subheader("📊 Detailed Analysis")
+    st.markdown("---")
+
+    # Recommendation at the top
+    st.markdown("#### ✅ Recommendation:")
+    st.success(report['recommendation'])
+    st.markdown(report['savings'])
+    st.markdown("---")
+
+    # Tabular Comparison of Scenarios
+    st.markdown("#### 📈 Financing Scenarios Comparison")
+    st.markdown(report['scenario_descriptions'])
+    st.markdown(report['comparison_table'])
+
+    # Definitions Expander (Updated)
+    with st.expander("❓ Understanding the Key Metric: Net Effective Cost"): 
+        st.markdown("""
+        Here's a breakdown of the core financial metric used in this analysis:
         
-        # Display custom capital contribution based on input type
-        if inputs['custom_capital_input_type'] == 'Value (Lakhs)': # Match the radio button label exactly
-            st.write(f"**Custom Capital Contribution (Scenario 3):** ₹{inputs['custom_capital_contribution']:.1f} lakh")
-        else:
-            st.write(f"**Custom Capital Contribution (Scenario 3):** {inputs['custom_capital_percentage']:.1f}% of Own Capital (₹{inputs['custom_capital_contribution']:.1f} lakh)")
-
-
-        investment_details = self.investment_options[inputs['investment_type']]
-        st.markdown("##### Investment Details:")
-        st.write(f" - **Liquidity:** {investment_details['liquidity']}")
-        st.write(f" - **Tax Efficiency:** {investment_details['tax_efficiency']}")
-        st.write(f" - **Compounding:** {investment_details['compounding']}")
-        st.markdown("---")
-
-        # Key Insights & Strategic Considerations - Improved Representation
-        st.markdown("#### 🔍 Key Insights & Strategic Considerations:")
+        **Net Effective Cost (True Economic Cost):**
+        This is the **ultimate financial burden** of funding the project, reflecting what the project *truly costs you* after accounting for all direct expenses, tax advantages, and investment benefits. It's calculated as:
+        `Net Effective Cost = Total Project Cost + Effective Total Loan Interest (After Tax) - Post-Tax Investment Gains`
         
-        col_metrics_1, col_metrics_2, col_metrics_3 = st.columns(3)
-        with col_metrics_1:
-            st.metric(label="Effective Loan Interest Rate (After Tax) (Annualized)", value=f"{results['effective_loan_rate_annual']:.2f}% p.a.", delta_color="off")
-        with col_metrics_2:
-            st.metric(label="Effective Investment Return (After Tax) (Annualized)", value=f"{results['effective_investment_return_annual']:.2f}% p.a.", delta_color="off")
-        with col_metrics_3:
-            st.metric(label="Interest Rate Spread (Loan - Investment)", value=f"{results['interest_spread']:.2f}%", delta_color="off")
+        Let's break that down:
+        * **Total Project Cost:** The fundamental purchase or development cost of the project itself.
+        * **Effective Total Loan Interest (After Tax):** This is the total gross interest you pay on your loan, reduced by any tax savings if the loan interest is tax-deductible (based on your input Tax Rate). This provides the *actual* cost of borrowing.
+        * **Post-Tax Investment Gains:** If you invest your own capital, any profits earned from that investment (after taxes) are subtracted from your total cost. These gains effectively reduce the overall financial impact of the project on your net worth.
         
-        st.markdown("""
-        These annualized rates provide a clearer picture of the true cost of borrowing and the actual return on your investments, factoring in tax benefits.
+        This metric provides the most accurate "bottom-line" figure for each financing scenario, allowing for a direct and comparable evaluation of the real economic impact.
         """)
+    st.markdown("---")
 
-        with st.expander("Risk & Scenario Analysis"):
-            st.write(f" - **Loan Interest Rate Risk:** The loan is **{inputs['loan_type']}**. If floating, consider sensitivity to rate hikes and build in buffers.")
-            st.write(f" - **Prepayment Cost:** A {inputs['prepayment_penalty_pct']:.2f}% penalty on a full loan (Scenario 2) would be **₹{results['prepayment_cost']:.2f} lakh**. Factor this into early exit scenarios and loan terms.")
-            st.write(" - **Investment Volatility:** Assumed investment returns are estimates. Stress test your plan with $\pm 1-2\%$ returns to understand the impact on net effective cost and liquidity.")
-            st.write(f" - **Liquidity Buffer:** Your target minimum liquidity is **₹{inputs['min_liquidity_target']:.1f} lakh**. Ensure the chosen option consistently maintains this, especially under stressed cash flow scenarios (e.g., delayed project revenue, unexpected expenses).")
-        
-        with st.expander("Nuanced Strategic Considerations"):
-            if inputs['loan_interest_deductible']:
-                st.write(" - **Tax Planning:** Loan interest is considered tax-deductible, significantly reducing the effective cost of borrowing. Ensure proper documentation for claiming this deduction.")
-            else:
-                st.write(" - **Tax Planning:** Loan interest is NOT considered tax-deductible, meaning the gross interest is the effective cost. Explore other tax optimization strategies.")
-            st.write(" - **Credit Profile & Leverage:** Assess the impact of increased debt on your company's debt-to-equity ratio, credit rating, and future borrowing capacity. Excessive leverage can affect banking relationships and future funding flexibility.")
-            st.write(" - **Regulatory Compliance:** Confirm all documentation (project reports, audited financials) are ready for smooth loan disbursal and subsequent annual reviews to avoid penalties or delays.")
-            st.write(" - **Investment Liquidity/Market Risk:** Even 'liquid' investments carry some market risk (e.g., temporary impairment during market freezes). Maintain an emergency buffer in a highly liquid bank account (beyond investment) for immediate needs.")
-            st.write(" - **Optimization Moves & Additional Value Levers:** Consider phased loan drawdown or capital deployment strategies to minimize idle funds and optimize interest costs or investment gains.")
-        st.markdown("---")
-
-    def generate_pdf_report(self, inputs, results, year_wise_df):
-        """Generates a PDF report using ReportLab."""
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=A4,
-                                rightMargin=0.5*inch, leftMargin=0.5*inch,
-                                topMargin=0.5*inch, bottomMargin=0.5*inch)
-        styles = getSampleStyleSheet()
-        # Custom style for small font tables
-        styles.add(ParagraphStyle(name='TableCaption', fontSize=8, alignment=TA_CENTER))
-        styles.add(ParagraphStyle(name='SmallTableText', fontSize=6, alignment=TA_CENTER))
-        styles.add(ParagraphStyle(name='SmallTableTextLeft', fontSize=6, alignment=TA_LEFT))
-
-        story = []
+    # Input Summary
+    st.markdown("#### 📋 Input Parameters Used:")
+    st.markdown(report['input_summary'])
+
+    st.markdown("##### Investment Details:")
+    st.markdown(report['investment_details'])
+    st.markdown("---")
+
+    # Key Insights & Strategic Considerations - Improved Representation
+    st.markdown("#### 🔍 Key Insights & Strategic Considerations:")
+    
+    st.markdown(report['key_metrics'], unsafe_allow_html=True)
+    
+    st.markdown("""
+    These annualized rates provide a clearer picture of the true cost of borrowing and the actual return on your investments, factoring in tax benefits.
+    """)
+
+    with st.expander("Risk & Scenario Analysis"):
+        st.markdown(report['risks'])
+    
+    with st.expander("Nuanced Strategic Considerations"):
+        st.markdown(report['strategic_considerations'])
+    st.markdown("---")
 
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def _build_chart_images(inputs, results, _year_wise_df):
+    """PNG bytes of the results charts. Cached so reruns with unchanged inputs skip matplotlib entirely."""
+    from matplotlib.figure import Figure
+    plt, sns = _get_plotting()
+
+    def new_axes():
+        # Created outside pyplot, so nothing is tracked globally once the image is saved
+        return Figure(figsize=(10, 6)).subplots()
+
+    # The style temporarily replaces the global rcParams, so concurrent builds are serialized
+    with _get_chart_style_lock(), plt.style.context('seaborn-v0_8'):
+        ax_cost = new_axes()
+        _plot_scenario_lines(ax_cost, _year_wise_df, 'Cumulative_Net_Effective_Cost')
+        ax_cost.set_xlabel("Year")
+        ax_cost.set_ylabel("Cumulative Net Effective Cost (Lakh ₹)")
+        ax_cost.set_title("Cumulative Net Effective Cost for Each Scenario")
+        ax_cost.legend()
+        ax_cost.grid(True)
+
+        ax_interest = new_axes()
+        _plot_scenario_lines(ax_interest, _year_wise_df, 'Cumulative_Gross_Interest')
+        ax_interest.set_xlabel("Year")
+        ax_interest.set_ylabel("Cumulative Gross Interest Paid (Lakh ₹)")
+        ax_interest.set_title("Cumulative Gross Interest Paid for Each Scenario")
+        ax_interest.legend()
+        ax_interest.grid(True)
+
+        ax_bar = new_axes()
+        final_costs = [scenario.net_effective_cost for scenario in results.scenarios]
+        sns.barplot(x=SCENARIO_LABELS, y=final_costs, hue=SCENARIO_LABELS, ax=ax_bar, palette='viridis', legend=False)
+        # One container per hue level, so label each scenario's bar in its own container
+        for container in ax_bar.containers:
+            ax_bar.bar_label(container, fmt='₹{:.1f}L', padding=3, fontweight='bold')
+        ax_bar.set_xlabel("Scenario")
+        ax_bar.set_title("Final Net Effective Cost by Scenario")
+        ax_bar.set_ylabel("Net Effective Cost (Lakh ₹)")
+
+        sweep_png = None
+        if inputs.own_capital > 0:
+            capital_grid = np.linspace(0, inputs.own_capital, 101)
+            ax_sweep = new_axes()
+            ax_sweep.plot(capital_grid, sweep_scenario3(inputs, capital_grid), label='Scenario 3')
+            ax_sweep.axvline(inputs.custom_capital_contribution, color='grey', linestyle='--', label='Current Contribution')
+            ax_sweep.set_xlabel("Custom Capital Contribution (Lakh ₹)")
+            ax_sweep.set_ylabel("Net Effective Cost (Lakh ₹)")
+            ax_sweep.set_title("Scenario 3 Net Effective Cost vs Custom Capital Contribution")
+            ax_sweep.legend()
+            ax_sweep.grid(True)
+            sweep_png = _figure_png(ax_sweep.figure)
+
+        return ChartImages(_figure_png(ax_cost.figure), _figure_png(ax_interest.figure), _figure_png(ax_bar.figure), sweep_png)
+
+
+def _figure_png(fig):
+    """PNG bytes of a figure, saved with the same options st.pyplot uses."""
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', dpi=200, bbox_inches='tight')
+    return buffer.getvalue()
+
+
+def _plot_scenario_lines(ax, year_wise_df, column):
+    """Plots the S1/S2/S3 `column` series of the year-wise data against Year in a single plot call."""
+    lines = ax.plot(
+        year_wise_df['Year'],
+        year_wise_df[[f'S{i}_{column} (Lakh)' for i in (1, 2, 3)]].to_numpy(),
+        label=SCENARIO_LABELS
+    )
+    for line, marker in zip(lines, SCENARIO_MARKERS):
+        line.set_marker(marker)
+
+
+# The export builders are keyed on the frozen inputs and results alone. The year-wise frame is derived
+# from them, so its leading underscore tells st.cache_data not to hash it on every call.
+@st.cache_data(show_spinner=False, max_entries=32)
+def _build_csv(inputs, results, _year_wise_df):
+    """UTF-8 CSV bytes of the year-wise data, written by Arrow's C++ CSV writer."""
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+
+    buffer = io.BytesIO()
+    pa_csv.write_csv(pa.Table.from_pandas(_year_wise_df, preserve_index=False), buffer)
+    return buffer.getvalue()
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def _build_parquet(inputs, results, _year_wise_df):
+    """Snappy-compressed Parquet bytes of the year-wise data, for loading back into pandas or Arrow tools."""
+    import pyarrow as pa
+    from pyarrow import parquet as pa_parquet
+
+    buffer = io.BytesIO()
+    pa_parquet.write_table(pa.Table.from_pandas(_year_wise_df, preserve_index=False), buffer, compression='snappy')
+    return buffer.getvalue()
+
+
+def _write_excel_sheet(workbook, name, header_format, header, rows):
+    """Adds a worksheet and writes its header and data rows with one write_row call per row."""
+    worksheet = workbook.add_worksheet(name)
+    worksheet.write_row(0, 0, header, header_format)
+    for row_index, row in enumerate(rows, start=1):
+        worksheet.write_row(row_index, 0, row)
+    return worksheet
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def _build_excel(inputs, results, _year_wise_df):
+    """Builds the Excel workbook bytes. Cached so reruns with unchanged inputs skip the export."""
+    import xlsxwriter
+
+    buffer = io.BytesIO()
+    # in_memory keeps xlsxwriter from staging the workbook in temp files
+    workbook = xlsxwriter.Workbook(buffer, {'in_memory': True})
+    header_format = workbook.add_format({'bold': True, 'border': 1})
+
+    year_wise_sheet = _write_excel_sheet(
+        workbook, 'Year-wise Data', header_format,
+        _year_wise_df.columns.tolist(), _year_wise_df.itertuples(index=False, name=None)
+    )
+    # One fixed width for every column instead of sizing cells one by one
+    year_wise_sheet.set_column(0, len(_year_wise_df.columns) - 1, 18)
+
+    # 'description' and 'total_gross_loan_payments' are not needed in this summary view
+    summary_fields = [name for name in ScenarioResult.__dataclass_fields__
+                      if name not in ('description', 'total_gross_loan_payments')]
+    _write_excel_sheet(
+        workbook, 'Summary Results', header_format, ['', *summary_fields],
+        ([label, *(getattr(scenario, name) for name in summary_fields)]
+         for label, scenario in zip(SCENARIO_LABELS, results.scenarios))
+    )
+    # The same (parameter, value) rows as the on-screen and PDF input summaries
+    _write_excel_sheet(workbook, 'Input Parameters', header_format, ['Parameter', 'Value'], _input_summary_rows(inputs))
+    _write_excel_sheet(
+        workbook, 'Investment Options', header_format, ['Investment Type', *InvestmentDetail._fields],
+        ((name, *detail) for name, detail in INVESTMENT_OPTIONS.items())
+    )
+    workbook.close()
+    return buffer.getvalue()
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def _build_pdf(inputs, results, _year_wise_df, report_date):
+    """Builds the PDF report bytes. Cached per input set and report date, so a new day gets a freshly dated report."""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.units import inch
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, LongTable
+
+    pdf_styles = _get_pdf_styles()
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4,
+                            rightMargin=0.5*inch, leftMargin=0.5*inch,
+                            topMargin=0.5*inch, bottomMargin=0.5*inch)
+    styles = pdf_styles.paragraphs
+    h1, h2, h3, normal = styles['h1'], styles['h2'], styles['h3'], styles['Normal']
+
+    # Input Parameters
+    input_data = [['Parameter', 'Value'], *map(list, _input_summary_rows(inputs))]
+    input_table = Table(input_data, colWidths=[2.5*inch, 3*inch])
+    input_table.setStyle(pdf_styles.input_table)
+
+    # Same numbers and formats as the on-screen table, with the description as the first row
+    pdf_comparison_values = {
+        scenario_name: [scenario.description, *formatted_values]
+        for (scenario_name, formatted_values), scenario in zip(_format_scenarios(results).items(), results.scenarios)
+    }
+    
+    # Build the comparison table for PDF
+    comparison_data_for_pdf = [
+        ['Metric', 'Scenario 1: Max Own Funding', 'Scenario 2: Max Leverage', 'Scenario 3: Balanced Approach']
+    ]
+    
+    metrics_list = ['Scenario Description'] + [metric for metric, _ in COMPARISON_METRICS]
+
+    comparison_data_for_pdf.extend(
+        [metric, *scenario_values] for metric, *scenario_values in zip(metrics_list, *pdf_comparison_values.values())
+    )
+
+    # Calculate dynamic column widths for A4
+    table_width = A4[0] - (doc.leftMargin + doc.rightMargin)
+    col_widths_pdf = [table_width * 0.25] # For Metric column
+    col_widths_pdf.extend([table_width * 0.25] * 3) # For 3 scenarios
+
+    comparison_table = Table(comparison_data_for_pdf, colWidths=col_widths_pdf)
+    comparison_table.setStyle(pdf_styles.comparison_table)
+
+    # Year-wise Data
+    # Format all columns except 'Year' (numeric Lakhs) to 2 decimal places in one vectorized call,
+    # straight into a string array that becomes the table body
+    cells = np.column_stack((
+        _year_wise_df['Year'].to_numpy().astype(str),
+        np.char.mod('%.2f', _year_wise_df.iloc[:, 1:].to_numpy())
+    ))
+    year_wise_data_for_pdf = [_year_wise_df.columns.tolist(), *cells.tolist()]
+
+    # Fixed narrow 'Year' column; the other columns share the rest of the frame width (page minus margins)
+    num_cols = len(year_wise_data_for_pdf[0])
+    year_col_width = 0.4 * inch
+    col_widths_year_wise = [year_col_width] + [(doc.width - year_col_width) / (num_cols - 1)] * (num_cols - 1)
+
+    # LongTable lays out long row sets incrementally; the header row repeats on every page. Fixed row
+    # heights (12pt leading plus the style's cell padding) spare ReportLab measuring every cell.
+    row_heights_year_wise = [19] + [18] * len(cells)
+    year_wise_table = LongTable(year_wise_data_for_pdf, colWidths=col_widths_year_wise, rowHeights=row_heights_year_wise,
+                                repeatRows=1, splitByRow=1)
+    year_wise_table.setStyle(pdf_styles.year_wise_table)
+
+    story = [
         # Title
-        story.append(Paragraph("Project Financing Analysis Report", styles['h1']))
-        story.append(Spacer(1, 0.2 * inch))
+        Paragraph("Project Financing Analysis Report", h1),
+        Spacer(1, 0.2 * inch),
 
         # Date of Report
-        story.append(Paragraph(f"Date: {pd.Timestamp.now().strftime('%Y-%m-%d')}", styles['Normal']))
-        story.append(Spacer(1, 0.2 * inch))
+        Paragraph(f"Date: {report_date.isoformat()}", normal),
+        Spacer(1, 0.2 * inch),
 
         # Recommendation
-        story.append(Paragraph("<b>Recommendation:</b>", styles['h2']))
-        recommendation_text = self.get_recommendation_text(results, inputs)
-        story.append(Paragraph(recommendation_text, styles['Normal']))
-        story.append(Paragraph(f"Potential Savings (compared to worst scenario): ₹{results['savings']:.2f} lakh", styles['Normal']))
-        story.append(Spacer(1, 0.2 * inch))
+        Paragraph("<b>Recommendation:</b>", h2),
+        Paragraph(get_recommendation_text(results, inputs), normal),
+        Paragraph(f"Potential Savings (compared to worst scenario): ₹{results.savings:.2f} lakh", normal),
+        Spacer(1, 0.2 * inch),
 
         # Input Parameters
-        story.append(Paragraph("<b>Input Parameters Used:</b>", styles['h2']))
-        input_data = [
-            ['Metric', 'Value'],
-            ['Total Project Cost', f"₹{inputs['project_cost']:.1f} lakh"],
-            ['Own Capital Available', f"₹{inputs['own_capital']:.1f} lakh"],
-            ['Bank Loan Interest Rate', f"{inputs['loan_rate']:.2f}% p.a. ({inputs['loan_type']})"],
-            ['Loan Tenure', f"{inputs['loan_tenure']} years"],
-            ['Loan Interest Tax Deductible', 'Yes' if inputs['loan_interest_deductible'] else 'No'],
-            ['Prepayment Penalty', f"{inputs['prepayment_penalty_pct']:.2f}%"],
-            ['Minimum Liquidity Target', f"₹{inputs['min_liquidity_target']:.1f} lakh"],
-            ['Investment Type', inputs['investment_type']],
-            ['Investment Return', f"{inputs['investment_return']:.2f}% p.a."],
-            ['Tax Rate', f"{inputs['tax_rate']:.0f}%"]
-        ]
-        if inputs['custom_capital_input_type'] == 'Value (Lakhs)': # Match the radio button label
-            input_data.append(['Custom Capital Contribution (Scenario 3)', f"₹{inputs['custom_capital_contribution']:.1f} lakh"])
-        else:
-            input_data.append(['Custom Capital Contribution (Scenario 3)', f"{inputs['custom_capital_percentage']:.1f}% of Own Capital (₹{inputs['custom_capital_contribution']:.1f} lakh)"])
-        
-        input_table = Table(input_data, colWidths=[2.5*inch, 3*inch])
-        input_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#D3D3D3')),
-            ('GRID', (0,0), (-1,-1), 1, colors.black),
-            ('ALIGN', (0,0), (-1,-1), 'LEFT'),
-            ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-            ('BOTTOMPADDING', (0,0), (-1,0), 6),
-            ('BACKGROUND', (0,1), (-1,-1), colors.white),
-            ('FONTSIZE', (0,0), (-1,-1), 10)
-        ]))
-        story.append(input_table)
-        story.append(Spacer(1, 0.2 * inch))
+        Paragraph("<b>Input Parameters Used:</b>", h2),
+        input_table,
+        Spacer(1, 0.2 * inch),
 
         # Investment Details
-        investment_details = self.investment_options[inputs['investment_type']]
-        story.append(Paragraph("<b>Investment Details:</b>", styles['h3']))
-        story.append(Paragraph(f" - <b>Liquidity:</b> {investment_details['liquidity']}", styles['Normal']))
-        story.append(Paragraph(f" - <b>Tax Efficiency:</b> {investment_details['tax_efficiency']}", styles['Normal']))
-        story.append(Paragraph(f" - <b>Compounding:</b> {investment_details['compounding']}", styles['Normal']))
-        story.append(Paragraph(f" - <b>Notes:</b> {investment_details['notes']}", styles['Normal']))
-        story.append(Spacer(1, 0.2 * inch))
+        Paragraph("<b>Investment Details:</b>", h3),
+        Paragraph("<br/>".join(_investment_detail_lines(inputs.investment_type, html=True)), normal),
+        Spacer(1, 0.2 * inch),
 
         # Financing Scenarios Comparison
-        story.append(Paragraph("<b>Financing Scenarios Comparison:</b>", styles['h2']))
-        
-        # Prepare data for PDF comparison table, ensuring consistent formatting and updated names
-        pdf_comparison_values = {
-            'Scenario 1: Maximum Own Funding': [
-                results['scenario1']['description'],
-                f"₹{results['scenario1']['capital_used_directly']:.1f} lakh",
-                "₹0.0 lakh", 
-                f"₹{results['scenario1']['loan_amount']:.1f} lakh",
-                f"₹{results['scenario1']['emi']:,.0f}",
-                f"₹{results['scenario1']['gross_total_interest']:.1f} lakh",
-                f"₹{results['scenario1']['effective_total_interest']:.1f} lakh",
-                "₹0.0 lakh",
-                "₹0.0 lakh",
-                f"₹{results['scenario1']['net_effective_cost']:.2f} lakh"
-            ],
-            'Scenario 2: Maximum Leverage': [
-                results['scenario2']['description'],
-                f"₹{results['scenario2']['capital_used_directly']:.1f} lakh",
-                f"₹{results['scenario2']['capital_invested']:.1f} lakh",
-                f"₹{results['scenario2']['loan_amount']:.1f} lakh",
-                f"₹{results['scenario2']['emi']:,.0f}",
-                f"₹{results['scenario2']['gross_total_interest']:.1f} lakh",
-                f"₹{results['scenario2']['effective_total_interest']:.1f} lakh",
-                f"₹{results['scenario2']['investment_maturity']:.2f} lakh",
-                f"₹{results['scenario2']['post_tax_gain']:.2f} lakh",
-                f"₹{results['scenario2']['net_effective_cost']:.2f} lakh"
-            ],
-            'Scenario 3: Balanced Approach': [
-                results['scenario3']['description'],
-                f"₹{results['scenario3']['capital_used_directly']:.1f} lakh",
-                f"₹{results['scenario3']['remaining_own_capital_invested']:.1f} lakh",
-                f"₹{results['scenario3']['loan_amount']:.1f} lakh",
-                f"₹{results['scenario3']['emi']:,.0f}",
-                f"₹{results['scenario3']['gross_total_interest']:.1f} lakh",
-                f"₹{results['scenario3']['effective_total_interest']:.1f} lakh",
-                f"₹{results['scenario3']['investment_maturity']:.2f} lakh" if results['scenario3']['remaining_own_capital_invested'] > 0 else "₹0.0 lakh",
-                f"₹{results['scenario3']['post_tax_gain']:.2f} lakh" if results['scenario3']['remaining_own_capital_invested'] > 0 else "₹0.0 lakh",
-                f"₹{results['scenario3']['net_effective_cost']:.2f} lakh"
-            ]
-        }
-        
-        # Build the comparison table for PDF
-        comparison_data_for_pdf = [
-            ['Metric', 'Scenario 1: Max Own Funding', 'Scenario 2: Max Leverage', 'Scenario 3: Balanced Approach']
-        ]
-        
-        # Match metrics to the dynamically generated values (using updated names)
-        metrics_list = [
-            'Scenario Description',
-            'Own Capital Used for Project',
-            'Own Capital Available & Invested',
-            'Loan Amount Required',
-            'Monthly EMI',
-            'Gross Total Interest Paid (Loan)',
-            'Effective Total Interest (After Tax Benefits)',
-            'Total Investment Maturity Value',
-            'Total Post-Tax Investment Gain',
-            'NET EFFECTIVE COST'
-        ]
+        Paragraph("<b>Financing Scenarios Comparison:</b>", h2),
+        comparison_table,
+        Spacer(1, 0.2 * inch),
+        Paragraph("<i>Detailed explanation of 'Net Effective Cost' is available in the web application.</i>", styles['Italic']),
+        Spacer(1, 0.2 * inch),
 
-        for i, metric in enumerate(metrics_list):
-            row = [metric]
-            row.append(pdf_comparison_values['Scenario 1: Maximum Own Funding'][i])
-            row.append(pdf_comparison_values['Scenario 2: Maximum Leverage'][i])
-            row.append(pdf_comparison_values['Scenario 3: Balanced Approach'][i])
-            comparison_data_for_pdf.append(row)
-
-        # Calculate dynamic column widths for A4
-        table_width = A4[0] - (doc.leftMargin + doc.rightMargin)
-        col_widths_pdf = [table_width * 0.25] # For Metric column
-        col_widths_pdf.extend([table_width * 0.25] * 3) # For 3 scenarios
-
-        comparison_table = Table(comparison_data_for_pdf, colWidths=col_widths_pdf)
-        comparison_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#D3D3D3')),
-            ('GRID', (0,0), (-1,-1), 1, colors.black),
-            ('ALIGN', (0,0), (-1,-1), 'CENTER'),
-            ('ALIGN', (0,0), (0,-1), 'LEFT'), # Left align metric column
-            ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-            ('BOTTOMPADDING', (0,0), (-1,0), 6),
-            ('BACKGROUND', (0,1), (-1,-1), colors.white),
-            ('FONTSIZE', (0,0), (-1,-1), 8), # Smaller font for more compact table
-            ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-        ]))
-        story.append(comparison_table)
-        story.append(Spacer(1, 0.2 * inch))
-        story.append(Paragraph("<i>Detailed explanation of 'Net Effective Cost' is available in the web application.</i>", styles['Italic']))
-        story.append(PageBreak()) # Start Year-wise data on a new page
+        # Year-wise Data
+        Paragraph("<b>Year-wise Financial Data:</b>", h2),
+        Spacer(1, 0.1 * inch),
+        year_wise_table
+    ]
 
+    doc.build(story)
+    return buffer.getvalue()
 
-        # Year-wise Data
-        story.append(Paragraph("<b>Year-wise Financial Data:</b>", styles['h2']))
-        story.append(Spacer(1, 0.1 * inch))
 
-        # Convert DataFrame to list of lists for ReportLab table, including headers
-        year_wise_data_for_pdf = [year_wise_df.columns.tolist()] + year_wise_df.values.tolist()
-        
-        # Apply formatting to numeric columns in year_wise_data_for_pdf
-        for r_idx, row in enumerate(year_wise_data_for_pdf):
-            if r_idx == 0: # Skip header row
-                continue
-            for c_idx, value in enumerate(row):
-                if c_idx > 0: # All columns except 'Year' are numeric Lakhs
-                    year_wise_data_for_pdf[r_idx][c_idx] = f"{value:.2f}" # Format to 2 decimal places
-
-        # Set column widths to try and fit on page
-        # This will require careful balancing for the number of columns (13) on an A4 page
-        num_cols = len(year_wise_data_for_pdf[0])
-        # Total available width for table after margins
-        table_effective_width = A4[0] - (doc.leftMargin + doc.rightMargin)
-        
-        # Assign a fixed small width to the 'Year' column
-        col_widths_year_wise = [0.4 * inch] 
-        remaining_width = table_effective_width - col_widths_year_wise[0]
-        # Distribute remaining width among the other 12 columns
-        width_per_value_col = remaining_width / (num_cols - 1)
-        col_widths_year_wise.extend([width_per_value_col] * (num_cols - 1))
-        
-        try:
-            year_wise_table = Table(year_wise_data_for_pdf, colWidths=col_widths_year_wise)
-            year_wise_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#D3D3D3')),
-                ('GRID', (0,0), (-1,-1), 0.5, colors.black),
-                ('ALIGN', (0,0), (-1,-1), 'CENTER'),
-                ('VALIGN', (0,0), (-1,-1), 'MIDDLE'), # Changed from '-1,-1' to just 'MIDDLE' as per ReportLab docs
-                ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-                ('BOTTOMPADDING', (0,0), (-1,0), 4),
-                ('BACKGROUND', (0,1), (-1,-1), colors.white),
-                ('FONTSIZE', (0,0), (-1,-1), 5) # VERY small font to try and fit
-            ]))
-            story.append(year_wise_table)
-        except Exception as e:
-            # Fallback for tables too wide to fit
-            story.append(Paragraph(f"<font color='red'><i>Could not generate Year-wise table in PDF due to layout constraints: {e}. "
-                                   f"It contains {num_cols} columns and might be too wide for the page. "
-                                   f"Please download the Excel/CSV for full year-wise data.</i></font>", styles['Normal']))
-
-        doc.build(story)
-        buffer.seek(0)
-        return buffer
+@st.fragment
+def render_visualizations_and_downloads(inputs, results):
+    """Charts and download buttons for a calculated comparison. A fragment, so a download click reruns only this part."""
+    st.markdown("---")
+    st.header("4. Visualizations")
+
+    # --- Plotting ---
+    year_wise_df = generate_year_wise_data(inputs, results)
+    charts = _build_chart_images(inputs, results, year_wise_df)
+
+    col_plot1, col_plot2 = st.columns(2)
+
+    with col_plot1:
+        st.subheader("Net Effective Cost Over Years")
+        st.image(charts.cost, width='stretch')
+
+    with col_plot2:
+        st.subheader("Cumulative Gross Interest Paid Over Years")
+        st.image(charts.interest, width='stretch')
+
+    # Bar chart for final Net Effective Cost
+    st.subheader("Final Net Effective Cost Comparison")
+    st.image(charts.bar, width='stretch')
+
+    # Scenario 3 across every possible custom contribution, from all-invested to all-used
+    if charts.sweep is not None:
+        st.subheader("Scenario 3 Net Effective Cost by Custom Capital Contribution")
+        st.image(charts.sweep, width='stretch')
+
+    st.markdown("---")
+    st.header("5. Download Data")
+
+    # The files are built only when a button is clicked, on a separate thread from the rerun
+    st.download_button(
+        label="Download Year-wise Data as CSV",
+        data=partial(_build_csv, inputs, results, year_wise_df),
+        file_name="project_financing_year_wise_data.csv",
+        mime="text/csv",
+        key="download_csv"
+    )
+
+    st.download_button(
+        label="Download Year-wise Data as Parquet",
+        data=partial(_build_parquet, inputs, results, year_wise_df),
+        file_name="project_financing_year_wise_data.parquet",
+        mime="application/vnd.apache.parquet",
+        key="download_parquet"
+    )
+
+    st.download_button(
+        label="Download Full Report as Excel",
+        data=partial(_build_excel, inputs, results, year_wise_df),
+        file_name="project_financing_report.xlsx",
+        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        key="download_excel"
+    )
+
+    # Today's date is read at click time, so a page left open past midnight still dates the report correctly
+    st.download_button(
+        label="Download Summary Report as PDF",
+        data=lambda: _build_pdf(inputs, results, year_wise_df, date.today()),
+        file_name="project_financing_summary_report.pdf",
+        mime="application/pdf",
+        key="download_pdf"
+    )
 
 
 def main():
     st.set_page_config(layout="wide", page_title="Project Financing Calculator")
-    calculator = ProjectFinancingCalculator()
-    styles = getSampleStyleSheet() 
-    
-    # Custom ParagraphStyle for PDF: Modify the existing 'Italic' style if it exists
-    if 'Italic' in styles:
-        styles['Italic'].fontName = 'Helvetica-Oblique'
-        styles['Italic'].fontSize = 9
-        styles['Italic'].alignment = TA_LEFT
-    else:
-        # Fallback: if for some reason 'Italic' isn't there (unlikely), add it
-        styles.add(ParagraphStyle(name='Italic', fontName='Helvetica-Oblique', fontSize=9, alignment=TA_LEFT))
-
 
     st.title("💰 Project Financing Strategy Calculator")
     st.markdown("""
@@ -886,23 +1131,18 @@ def main():
             st.info(f"This translates to: ₹{custom_capital_contribution:.1f} Lakhs")
 
     with col2:
-        loan_rate = st.number_input("Bank Loan Interest Rate (% p.a.)", min_value=0.1, value=9.0, step=0.1)
-        loan_type = st.radio("Loan Type", ('Floating', 'Fixed'))
-        loan_tenure = st.number_input("Loan Tenure (Years)", min_value=1, value=10, step=1)
-        loan_interest_deductible = st.checkbox("Loan Interest Tax-Deductible (for business expenses)", value=True)
-        prepayment_penalty_pct = st.number_input("Prepayment Penalty (% of outstanding loan)", min_value=0.0, value=0.0, step=0.1)
-        min_liquidity_target = st.number_input("Minimum Liquidity Target (in Lakhs ₹)", min_value=0.0, value=10.0, step=1.0)
+        loan_inputs = {field: getattr(st, widget)(**kwargs) for field, widget, kwargs in LOAN_INPUT_WIDGETS}
 
     st.markdown("---")
     st.header("2. Input Investment Details")
     col3, col4 = st.columns(2)
     with col3:
-        investment_types = list(calculator.investment_options.keys())
+        investment_types = list(INVESTMENT_OPTIONS.keys())
         default_investment_index = investment_types.index('Liquid Funds') if 'Liquid Funds' in investment_types else 0
         investment_type = st.selectbox("Select Investment Type for Own Capital", investment_types, index=default_investment_index)
         
         # Display default return for selected type, allow override
-        default_inv_return = calculator.investment_options[investment_type]['default_return']
+        default_inv_return = INVESTMENT_OPTIONS[investment_type].default_return
         investment_return = st.number_input(f"Expected Investment Return (% p.a. - for {investment_type})", min_value=0.0, value=default_inv_return, step=0.1)
         
     with col4:
@@ -910,129 +1150,34 @@ def main():
 
     st.markdown("---")
 
-    # Prepare inputs dictionary
-    inputs = {
-        'project_cost': project_cost,
-        'own_capital': own_capital,
-        'loan_rate': loan_rate,
-        'loan_type': loan_type,
-        'loan_tenure': loan_tenure,
-        'loan_interest_deductible': loan_interest_deductible,
-        'prepayment_penalty_pct': prepayment_penalty_pct,
-        'min_liquidity_target': min_liquidity_target,
-        'investment_type': investment_type,
-        'investment_return': investment_return,
-        'tax_rate': tax_rate,
-        'custom_capital_input_type': custom_capital_input_type,
-        'custom_capital_percentage': custom_capital_percentage if custom_capital_input_type == 'Percentage of Own Capital (%)' else 0,
-        'custom_capital_contribution': custom_capital_contribution
-    }
+    # Prepare inputs
+    inputs = Inputs(
+        project_cost=project_cost,
+        own_capital=own_capital,
+        **loan_inputs,
+        investment_type=investment_type,
+        investment_return=investment_return,
+        tax_rate=tax_rate,
+        custom_capital_input_type=custom_capital_input_type,
+        custom_capital_percentage=custom_capital_percentage if custom_capital_input_type == 'Percentage of Own Capital (%)' else 0,
+        custom_capital_contribution=custom_capital_contribution
+    )
 
     # --- Calculation & Display Section ---
     st.header("3. Results")
     
     if st.button("Calculate Financing Scenarios"):
         # Perform calculations
-        results = calculator.calculate_comparison(inputs)
+        try:
+            results = calculate_comparison(inputs)
+        except ValueError as e:
+            st.error(str(e))
+            results = None
 
         if results: # Only proceed if calculations were successful
             # Print detailed report
-            calculator.print_detailed_report(inputs, results)
-            
-            st.markdown("---")
-            st.header("4. Visualizations")
-
-            # --- Plotting ---
-            year_wise_df = calculator.generate_year_wise_data(inputs, results)
-            
-            col_plot1, col_plot2 = st.columns(2)
-
-            with col_plot1:
-                st.subheader("Net Effective Cost Over Years")
-                fig_cost, ax_cost = plt.subplots(figsize=(10, 6))
-                ax_cost.plot(year_wise_df['Year'], year_wise_df['S1_Cumulative_Net_Effective_Cost (Lakh)'], label='Scenario 1', marker='o')
-                ax_cost.plot(year_wise_df['Year'], year_wise_df['S2_Cumulative_Net_Effective_Cost (Lakh)'], label='Scenario 2', marker='x')
-                ax_cost.plot(year_wise_df['Year'], year_wise_df['S3_Cumulative_Net_Effective_Cost (Lakh)'], label='Scenario 3', marker='s')
-                ax_cost.set_xlabel("Year")
-                ax_cost.set_ylabel("Cumulative Net Effective Cost (Lakh ₹)")
-                ax_cost.set_title("Cumulative Net Effective Cost for Each Scenario")
-                ax_cost.legend()
-                ax_cost.grid(True)
-                st.pyplot(fig_cost)
-
-            with col_plot2:
-                st.subheader("Cumulative Gross Interest Paid Over Years")
-                fig_interest, ax_interest = plt.subplots(figsize=(10, 6))
-                ax_interest.plot(year_wise_df['Year'], year_wise_df['S1_Cumulative_Gross_Interest (Lakh)'], label='Scenario 1', marker='o')
-                ax_interest.plot(year_wise_df['Year'], year_wise_df['S2_Cumulative_Gross_Interest (Lakh)'], label='Scenario 2', marker='x')
-                ax_interest.plot(year_wise_df['Year'], year_wise_df['S3_Cumulative_Gross_Interest (Lakh)'], label='Scenario 3', marker='s')
-                ax_interest.set_xlabel("Year")
-                ax_interest.set_ylabel("Cumulative Gross Interest Paid (Lakh ₹)")
-                ax_interest.set_title("Cumulative Gross Interest Paid for Each Scenario")
-                ax_interest.legend()
-                ax_interest.grid(True)
-                st.pyplot(fig_interest)
-
-            # Bar chart for final Net Effective Cost
-            st.subheader("Final Net Effective Cost Comparison")
-            final_costs = {
-                'Scenario 1': results['scenario1']['net_effective_cost'],
-                'Scenario 2': results['scenario2']['net_effective_cost'],
-                'Scenario 3': results['scenario3']['net_effective_cost']
-            }
-            cost_df = pd.DataFrame(final_costs.items(), columns=['Scenario', 'Net Effective Cost (Lakh ₹)'])
-            
-            fig_bar, ax_bar = plt.subplots(figsize=(10, 6))
-            sns.barplot(x='Scenario', y='Net Effective Cost (Lakh ₹)', data=cost_df, ax=ax_bar, palette='viridis')
-            ax_bar.set_title("Final Net Effective Cost by Scenario")
-            ax_bar.set_ylabel("Net Effective Cost (Lakh ₹)")
-            st.pyplot(fig_bar)
-
-            st.markdown("---")
-            st.header("5. Download Data")
-            
-            # Download DataFrame as CSV or Excel
-            csv_buffer = io.StringIO()
-            year_wise_df.to_csv(csv_buffer, index=False)
-            st.download_button(
-                label="Download Year-wise Data as CSV",
-                data=csv_buffer.getvalue(),
-                file_name="project_financing_year_wise_data.csv",
-                mime="text/csv",
-                key="download_csv"
-            )
-
-            excel_buffer = io.BytesIO()
-            with pd.ExcelWriter(excel_buffer, engine='xlsxwriter') as writer:
-                year_wise_df.to_excel(writer, sheet_name='Year-wise Data', index=False)
-                # You can add the summary results to another sheet
-                summary_data_for_excel = {
-                    "Scenario 1": results["scenario1"],
-                    "Scenario 2": results["scenario2"],
-                    "Scenario 3": results["scenario3"]
-                }
-                summary_df = pd.DataFrame.from_dict(summary_data_for_excel, orient='index')
-                # Filter out 'description' and 'total_gross_loan_payments' as they are not needed in this summary view
-                summary_df = summary_df.drop(columns=['description', 'total_gross_loan_payments'], errors='ignore') 
-                summary_df.to_excel(writer, sheet_name='Summary Results')
-            
-            st.download_button(
-                label="Download Full Report as Excel",
-                data=excel_buffer.getvalue(),
-                file_name="project_financing_report.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                key="download_excel"
-            )
-
-            # Download PDF Report
-            pdf_buffer = calculator.generate_pdf_report(inputs, results, year_wise_df)
-            st.download_button(
-                label="Download Summary Report as PDF",
-                data=pdf_buffer,
-                file_name="project_financing_summary_report.pdf",
-                mime="application/pdf",
-                key="download_pdf"
-            )
+            print_detailed_report(inputs, results)
+            render_visualizations_and_downloads(inputs, results)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,112 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: E402
+
+
+def _amortize(principal, annual_rate, tenure_years, emi):
+    """Month-by-month schedule: cumulative interest at the end of each year and the final balance."""
+    monthly_rate = annual_rate / (12 * 100)
+    balance = principal
+    cumulative_interest = 0.0
+    yearly_interest = [0.0]
+    for month in range(1, tenure_years * 12 + 1):
+        interest = balance * monthly_rate
+        cumulative_interest += interest
+        balance += interest - emi
+        if month % 12 == 0:
+            yearly_interest.append(cumulative_interest)
+    return np.array(yearly_interest), balance
+
+
+def _make_inputs(**overrides):
+    fields = dict(
+        project_cost=100.0,
+        own_capital=60.0,
+        loan_rate=9.0,
+        loan_tenure=10,
+        tax_rate=30.0,
+        investment_return=7.0,
+        custom_capital_contribution=25.0,
+        loan_interest_deductible=True,
+        investment_type='FD',
+        prepayment_penalty_pct=2.0,
+    )
+    fields.update(overrides)
+    return app.Inputs(**fields)
+
+
+@pytest.mark.parametrize('principal, rate, tenure', [
+    (1e5, 8.5, 20),
+    (37.3e5, 12.0, 1),
+    (5e6, 0.1, 30),
+    (1.0, 24.0, 5),
+])
+def test_calculate_emi_amortizes_to_zero(principal, rate, tenure):
+    emi = app.calculate_emi(principal, rate, tenure)
+    _, balance = _amortize(principal, rate, tenure, emi)
+    assert balance == pytest.approx(0.0, abs=1e-6 * principal)
+
+
+def test_calculate_emi_zero_rate_is_straight_line():
+    assert app.calculate_emi(1.2e5, 0, 10) == pytest.approx(1e3)
+
+
+def test_calculate_emi_zero_principal():
+    assert app.calculate_emi(0, 9.0, 10) == 0
+
+
+def test_calculate_emi_zero_tenure():
+    # With nothing to spread the repayment over, a zero-rate loan is repaid at once
+    assert app.calculate_emi(1e5, 0, 0) == 1e5
+    with pytest.raises(ValueError):
+        app.calculate_emi(1e5, 8.0, 0)
+
+
+def test_calculate_emi_rejects_negative_inputs():
+    with pytest.raises(ValueError):
+        app.calculate_emi(-1, 8.0, 10)
+
+
+@pytest.mark.parametrize('loan_amount, rate, tenure', [
+    (80.0, 9.0, 10),
+    (37.3, 12.0, 1),
+    (12.1, 0.0, 20),
+    (0.0, 9.0, 5),
+    (500.0, 18.0, 30),
+])
+def test_cumulative_interest_matches_amortization(loan_amount, rate, tenure):
+    emi = app.calculate_emi(loan_amount, rate, tenure)
+    expected, _ = _amortize(loan_amount, rate, tenure, emi)
+    actual = app._cumulative_interest(np.arange(tenure + 1), loan_amount, emi, rate / (12 * 100))
+    np.testing.assert_allclose(actual, expected, rtol=1e-9, atol=1e-9)
+
+
+def test_cumulative_interest_stacks_loans():
+    loans = np.array([80.0, 40.0, 0.0])
+    emis = np.array([app.calculate_emi(loan, 9.0, 10) for loan in loans])
+    actual = app._cumulative_interest(np.arange(11), loans[:, None], emis[:, None], 9.0 / (12 * 100))
+    for row, loan, emi in zip(actual, loans, emis):
+        np.testing.assert_allclose(row, _amortize(loan, 9.0, 10, emi)[0], rtol=1e-9, atol=1e-9)
+
+
+@pytest.mark.parametrize('overrides', [
+    {},
+    {'loan_rate': 0.0},
+    {'loan_interest_deductible': False, 'investment_type': 'Liquid Funds'},
+    {'own_capital': 150.0},
+    {'own_capital': 0.0, 'loan_tenure': 1},
+])
+def test_sweep_scenario3_matches_evaluate_scenario(overrides):
+    inputs = _make_inputs(**overrides)
+    capital_grid = np.linspace(0, inputs.own_capital, 7)
+    expected = [
+        app._evaluate_scenario(inputs, '', capital, max(0, inputs.own_capital - capital)).net_effective_cost
+        for capital in capital_grid
+    ]
+    np.testing.assert_allclose(app.sweep_scenario3(inputs, capital_grid), expected, rtol=1e-12, atol=1e-9)